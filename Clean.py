@@ -1,49 +1,68 @@
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 
 SCRAPED_DIR = "scraped_docs2"
 CLEANED_DIR = "cleaned_docs"
 
 os.makedirs(CLEANED_DIR, exist_ok=True)
 
+# Compiled once at import; clean_markdown runs on every scraped file.
+# Footer junk, cookie banners, markdown links and escaped underscores are
+# handled in one pass, dispatched on the name of the branch that matched.
+_RE_CLEANUP = re.compile(
+    r"""
+      (?P<footer>\n?(?:Copy|Dismiss|Manage\ Preferences)\n?)
+    | (?P<cookies>We\ use\ cookies\ and\ other\ similar\ technology.*?(?:Privacy|Cookie)\ Policy\.)
+    | (?P<mdlink>\[(?P<mdtext>[^\]]+)\]\([^)]+\))
+    | (?P<esc>\\_)
+    """,
+    re.DOTALL | re.VERBOSE,
+)
+# Blank-line collapse stays a separate pass: the removals above can create new runs
+_RE_BLANK = re.compile(r'\n{3,}')
+
+def _cleanup_repl(m: re.Match) -> str:
+    kind = m.lastgroup
+    if kind == "mdlink":
+        # Convert Markdown links [text](url) -> text
+        return m.group("mdtext").replace("\\_", "_")
+    if kind == "esc":
+        return "_"
+    return ""  # footer / cookies
+
 def clean_markdown(text: str) -> str:
-    # Remove footer junk
-    text = re.sub(r'\n?Copy\n?', '', text)
-    text = re.sub(r'\n?Dismiss\n?', '', text)
-    text = re.sub(r'\n?Manage Preferences\n?', '', text)
-    
-    # Remove cookie/privacy sections
-    text = re.sub(r"We use cookies and other similar technology.*?(Privacy Policy|Cookie Policy)\.", "", text, flags=re.DOTALL)
-
-    # Convert Markdown links [text](url) -> text
-    text = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', text)
-
-    # Remove HTML entities or artifacts
-    text = re.sub(r'\\_', '_', text)
-    
+    text = _RE_CLEANUP.sub(_cleanup_repl, text)
+
     # Remove multiple empty lines
-    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = _RE_BLANK.sub('\n\n', text)
 
     return text.strip()
 
 
-def process_all_md_files():
-    for filename in os.listdir(SCRAPED_DIR):
-        if not filename.endswith(".md"):
-            continue
+def _clean_one(input_path: str) -> str:
+    # Runs in a worker process; patterns and CLEANED_DIR are set up at import
+    output_path = os.path.join(CLEANED_DIR, os.path.basename(input_path))
 
-        input_path = os.path.join(SCRAPED_DIR, filename)
-        output_path = os.path.join(CLEANED_DIR, filename)
+    raw_content = Path(input_path).read_text(encoding="utf-8")
+    cleaned_content = clean_markdown(raw_content)
+    Path(output_path).write_bytes(cleaned_content.encode("utf-8"))
 
-        with open(input_path, "r", encoding="utf-8") as infile:
-            raw_content = infile.read()
+    return output_path
 
-        cleaned_content = clean_markdown(raw_content)
 
-        with open(output_path, "w", encoding="utf-8") as outfile:
-            outfile.write(cleaned_content)
+def process_all_md_files():
+    with os.scandir(SCRAPED_DIR) as it:
+        entries = [
+            (entry.name, entry.path) for entry in it
+            if entry.name.endswith(".md") and entry.is_file(follow_symlinks=False)
+        ]
+    input_paths = [path for _, path in entries]
 
-        print(f"[CLEANED] {filename} -> {output_path}")
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+        for (filename, _), output_path in zip(entries, ex.map(_clean_one, input_paths, chunksize=16)):
+            print(f"[CLEANED] {filename} -> {output_path}")
 
 if __name__ == "__main__":
     process_all_md_files()
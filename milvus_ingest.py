@@ -2,40 +2,112 @@
 import os
 import re
 import json
-import uuid
-from typing import List
+import asyncio
+import sqlite3
+import hashlib
+import logging
+from typing import Dict, List
+import numpy as np
+import torch
 from sentence_transformers import SentenceTransformer
 from pymilvus import (
     connections, FieldSchema, CollectionSchema, DataType,
     Collection, utility
 )
 
+# Optional: blake3 (SIMD, multi-lane) for embedding-cache keys (blake2b fallback)
+try:
+    from blake3 import blake3
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    BLAKE3_AVAILABLE = False
+
+# Optional: Infinity embedding server engine (continuous batching, fused kernels)
+try:
+    from infinity_emb import AsyncEngineArray, EngineArgs
+    INFINITY_AVAILABLE = True
+except ImportError:
+    INFINITY_AVAILABLE = False
+
 CLEANED_DIR = "cleaned_docs"
 COLLECTION_NAME = "cloudstack_docs"
+EMBED_MODEL_NAME = "BAAI/bge-m3"
 DIMENSION = 1024  # BGE-M3 embedding size
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence-transformers")  # or "infinity"
+EMBED_BATCH_SIZE = 64
+EMB_CACHE_PATH = "emb_cache.sqlite"  # content-hash -> embedding, survives re-runs
+CACHE_LOOKUP_BATCH = 500  # stay well under SQLite's host-parameter limit
+INSERT_BATCH_SIZE = 1000  # rows per collection.insert round-trip
 
 # -----------------------------
-# Milvus connection
+# Compiled patterns (built once, reused for every file)
 # -----------------------------
-connections.connect("default", host="localhost", port="19530")
+_RE_RESOURCE_NAME = re.compile(r"resources_([^.]+)\.md$")
+_RE_ARG_REF_START = re.compile(
+    r"^##\s*(?:\[[^\]]*Argument Reference[^\]]*\]\([^)]+\)|Argument Reference)\s*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+_RE_NEXT_H2 = re.compile(r"^\s*##\s+", re.MULTILINE)
+
+# One pass over the section; branches go from most to least specific:
+#   - [`name`](...) - (Required)
+#   - `name` - (Required)
+#   - name - (Required)
+# The dash may be escaped ('\-') in scraped markdown.
+_RE_REQUIRED = re.compile(
+    r"^\s*-\s*(?:\[\s*`?([a-zA-Z0-9_]+)`?\s*\]\([^)]+\)|`([a-zA-Z0-9_]+)`|([a-zA-Z0-9_]+))"
+    r"\s*(?:-|\\-)\s*\(Required\)",
+    re.MULTILINE,
+)
 
 # -----------------------------
 # Embedding model
 # -----------------------------
-print("🔄 Loading embedding model (BAAI/bge-m3)...")
-model = SentenceTransformer("BAAI/bge-m3")
-print("✅ Model loaded.")
+if EMBEDDING_BACKEND == "infinity" and not INFINITY_AVAILABLE:
+    print("⚠️ infinity_emb not installed - falling back to sentence-transformers")
+USE_INFINITY = EMBEDDING_BACKEND == "infinity" and INFINITY_AVAILABLE
+
+def load_model():
+    """
+    Load the encoder: an Infinity AsyncEngineArray when USE_INFINITY, otherwise a
+    SentenceTransformer. FP16 on GPU halves memory traffic; CPU stays in FP32
+    (half precision is slow there).
+    """
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    if USE_INFINITY:
+        print(f"🔄 Preparing Infinity engine ({EMBED_MODEL_NAME}) on {device}...")
+        model = AsyncEngineArray.from_args([
+            EngineArgs(
+                model_name_or_path=EMBED_MODEL_NAME,
+                engine="torch",
+                dtype="float16" if device == "cuda" else "float32",
+                batch_size=EMBED_BATCH_SIZE,
+            )
+        ])
+    else:
+        print(f"🔄 Loading embedding model ({EMBED_MODEL_NAME}) on {device}...")
+        model = SentenceTransformer(EMBED_MODEL_NAME, device=device)
+        if device == "cuda":
+            model.half()
+    print("✅ Model loaded.")
+    return model
 
 # -----------------------------
 # Collection schema
 # -----------------------------
 def ensure_collection():
     if utility.has_collection(COLLECTION_NAME):
-        return Collection(COLLECTION_NAME)
+        col = Collection(COLLECTION_NAME)
+        pk = next(f for f in col.schema.fields if f.is_primary)
+        if pk.dtype == DataType.INT64:
+            return col
+        # Older collections used VARCHAR uuid4 keys; rebuild with content-hash keys
+        print(f"♻️  Dropping '{COLLECTION_NAME}' (outdated primary key type {pk.dtype.name})...")
+        utility.drop_collection(COLLECTION_NAME)
 
     print("📁 Creating Milvus collection with metadata fields...")
     fields = [
-        FieldSchema(name="id", dtype=DataType.VARCHAR, is_primary=True, auto_id=False, max_length=36),
+        FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=False),  # content hash
         FieldSchema(name="resource", dtype=DataType.VARCHAR, max_length=128),
         FieldSchema(name="required_fields", dtype=DataType.VARCHAR, max_length=2048),  # JSON string
         FieldSchema(name="text", dtype=DataType.VARCHAR, max_length=65535),
@@ -50,8 +122,6 @@ def ensure_collection():
     print("✅ Collection created and indexed.")
     return col
 
-collection = ensure_collection()
-
 # -----------------------------
 # Helpers
 # -----------------------------
@@ -61,7 +131,7 @@ def extract_resource_name(filename: str) -> str | None:
       registry.terraform.io_providers_cloudstack_cloudstack_latest_docs_resources_instance.md
     -> cloudstack_instance
     """
-    m = re.search(r"resources_([^.]+)\.md$", filename)
+    m = _RE_RESOURCE_NAME.search(filename)
     return f"cloudstack_{m.group(1)}" if m else None
 
 def slice_argument_reference_section(text: str) -> str:
@@ -72,13 +142,12 @@ def slice_argument_reference_section(text: str) -> str:
       ## [Argument Reference](#argument-reference)
     Stops at next '## ' heading (Attributes/Import/etc.).
     """
-    start = re.search(r"^##\s*(?:\[[^\]]*Argument Reference[^\]]*\]\([^)]+\)|Argument Reference)\s*$",
-                      text, flags=re.IGNORECASE | re.MULTILINE)
+    start = _RE_ARG_REF_START.search(text)
     if not start:
         return text  # fallback: whole text
 
     section = text[start.end():]
-    end = re.search(r"^\s*##\s+", section, flags=re.MULTILINE)  # next H2
+    end = _RE_NEXT_H2.search(section)  # next H2
     return section[:end.start()] if end else section
 
 def extract_required_fields(text: str) -> List[str]:
@@ -90,56 +159,172 @@ def extract_required_fields(text: str) -> List[str]:
     Allow for escaped dash '\-' or plain '-'.
     """
     section = slice_argument_reference_section(text)
-    fields = set()
-
-    dash = r"\s*(?:-|\\-)\s*"  # matches '-' or '\-' with optional spaces
+    if "(Required)" not in section:
+        return []
 
-    patterns = [
-        # - [`name`](...) - (Required)
-        rf"^\s*-\s*\[\s*`?([a-zA-Z0-9_]+)`?\s*\]\([^)]+\){dash}\(Required\)",
-        # - `name` - (Required)
-        rf"^\s*-\s*`([a-zA-Z0-9_]+)`{dash}\(Required\)",
-        # - name - (Required)
-        rf"^\s*-\s*([a-zA-Z0-9_]+){dash}\(Required\)",
-    ]
+    fields = set()
 
-    for pat in patterns:
-        for m in re.finditer(pat, section, flags=re.MULTILINE):
-            fields.add(m.group(1))
+    for m in _RE_REQUIRED.finditer(section):
+        fields.add(m.group(1) or m.group(2) or m.group(3))
 
     return sorted(fields)
 
+def chunk_id(resource_name: str, chunk: str) -> int:
+    """
+    Deterministic 63-bit primary key for a (resource, chunk) pair, so re-ingesting
+    the same docs upserts rows instead of duplicating them. Always stdlib blake2b:
+    the key must not depend on which optional packages are installed.
+    """
+    data = f"{resource_name}\0{chunk}".encode("utf-8")
+    h = int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+    return h & ((1 << 63) - 1)  # Milvus INT64 is signed
+
 def split_text(text: str, max_words: int = 300) -> List[str]:
-    chunks, cur, words = [], [], 0
-    for line in text.splitlines():
+    """
+    Group whole lines into chunks of at most ~max_words words.
+    Chunks are slices of the original text (no per-chunk list + join).
+    """
+    chunks = []
+    chunk_start = pos = words = 0
+    lines = text.split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()  # a trailing newline does not open a new line
+    for line in lines:
         w = len(line.split())
-        if words + w > max_words and cur:
-            chunks.append("\n".join(cur))
-            cur, words = [], 0
-        cur.append(line)
+        if words + w > max_words and pos > chunk_start:
+            chunks.append(text[chunk_start:pos - 1])
+            chunk_start, words = pos, 0
         words += w
-    if cur:
-        chunks.append("\n".join(cur))
+        pos += len(line) + 1
+    if lines:
+        chunks.append(text[chunk_start:pos - 1])
     return chunks
 
+# -----------------------------
+# Embedding cache (SQLite, keyed by chunk content hash)
+# -----------------------------
+def open_embedding_cache(path: str = EMB_CACHE_PATH) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS emb (hash BLOB PRIMARY KEY, vec BLOB)")
+    return conn
+
+def chunk_hash(chunk: str) -> bytes:
+    # 16-byte keys: plenty for a docs corpus, half the index size of SHA-256
+    data = chunk.encode("utf-8")
+    if BLAKE3_AVAILABLE:
+        return blake3(data).digest()[:16]
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+def lookup_cached_embeddings(conn: sqlite3.Connection, hashes: List[bytes]) -> Dict[bytes, np.ndarray]:
+    """Return {hash: float32 vector} for every hash already in the cache."""
+    found = {}
+    for i in range(0, len(hashes), CACHE_LOOKUP_BATCH):
+        batch = hashes[i:i + CACHE_LOOKUP_BATCH]
+        placeholders = ",".join("?" * len(batch))
+        rows = conn.execute(f"SELECT hash, vec FROM emb WHERE hash IN ({placeholders})", batch)
+        for h, vec in rows:
+            found[bytes(h)] = np.frombuffer(vec, dtype=np.float16).astype(np.float32)
+    return found
+
+def store_embeddings(conn: sqlite3.Connection, hashes: List[bytes], vectors: np.ndarray) -> None:
+    # Stored as float16 to halve the cache size; one transaction for the whole batch.
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO emb (hash, vec) VALUES (?, ?)",
+            [(h, np.asarray(v, dtype=np.float16).tobytes()) for h, v in zip(hashes, vectors)],
+        )
+
+async def _encode_with_infinity(engines, texts: List[str]) -> np.ndarray:
+    engine = engines[EMBED_MODEL_NAME]
+    async with engine:  # starts/stops the batching worker
+        embeddings, _usage = await engine.embed(sentences=texts)
+    embs = np.asarray(embeddings, dtype=np.float32)
+    return embs / np.linalg.norm(embs, axis=1, keepdims=True)
+
+def encode_texts(model, texts: List[str]) -> np.ndarray:
+    """
+    Encode texts in length-homogeneous batches to minimise padding tokens.
+    Everything is tokenized once up front; the same token ids give the sort
+    order and feed the model (SentenceTransformer.encode would re-tokenize).
+    Batches go through the full module stack (transformer, pooling, normalize),
+    so outputs match model.encode(..., normalize_embeddings=True).
+    The Infinity backend does its own dynamic batching.
+    """
+    if USE_INFINITY:
+        return asyncio.run(_encode_with_infinity(model, texts))
+
+    tok = model.tokenizer
+    enc = tok(texts, padding=False, truncation=True, max_length=model.max_seq_length)
+    order = np.argsort([len(ids) for ids in enc["input_ids"]], kind="stable")
+
+    embeddings = np.empty((len(texts), DIMENSION), dtype=np.float32)
+    with torch.inference_mode():
+        for start in range(0, len(order), EMBED_BATCH_SIZE):
+            idx = order[start:start + EMBED_BATCH_SIZE]
+            batch = tok.pad({k: [enc[k][i] for i in idx] for k in enc.keys()}, return_tensors="pt")
+            features = {k: v.to(model.device) for k, v in batch.items()}
+            out = model(features)["sentence_embedding"].float()
+            embeddings[idx] = torch.nn.functional.normalize(out, p=2, dim=1).cpu().numpy()
+    return embeddings
+
+def embed_chunks(model, chunks: List[str], cache: sqlite3.Connection) -> np.ndarray:
+    """
+    Embed chunks, only running the model on distinct chunks missing from the cache.
+    Boilerplate repeated across docs is encoded once and fanned back out.
+    """
+    index_of: Dict[str, int] = {}
+    unique: List[str] = []
+    positions = []
+    for c in chunks:
+        if c not in index_of:
+            index_of[c] = len(unique)
+            unique.append(c)
+        positions.append(index_of[c])
+
+    hashes = [chunk_hash(c) for c in unique]
+    cached = lookup_cached_embeddings(cache, hashes)
+    miss_idx = [i for i, h in enumerate(hashes) if h not in cached]
+    print(f"   💾 Unique: {len(unique)}/{len(chunks)}, cache hits: {len(unique) - len(miss_idx)}, "
+          f"to encode: {len(miss_idx)}")
+
+    unique_embs = np.empty((len(unique), DIMENSION), dtype=np.float32)
+    for i, h in enumerate(hashes):
+        if h in cached:
+            unique_embs[i] = cached[h]
+
+    if miss_idx:
+        fresh = encode_texts(model, [unique[i] for i in miss_idx])
+        unique_embs[miss_idx] = fresh
+        store_embeddings(cache, [hashes[i] for i in miss_idx], fresh)
+
+    return unique_embs[positions]
+
 # -----------------------------
 # Main ingestion
 # -----------------------------
-def process_documents():
+def process_documents(model, collection):
     total_files = 0
-    total_chunks = 0
 
-    for filename in os.listdir(CLEANED_DIR):
-        if not filename.endswith(".md"):
-            continue
+    # Pass 1: collect every chunk with its metadata so the encoder sees one big batch
+    all_chunks: List[str] = []
+    all_meta: List[tuple] = []  # (doc_id, resource_name, required_json)
+    seen_ids = set()
+
+    with os.scandir(CLEANED_DIR) as it:
+        entries = [
+            entry for entry in it
+            if entry.name.endswith(".md") and entry.is_file(follow_symlinks=False)
+        ]
 
+    for entry in entries:
+        filename = entry.name
         resource_name = extract_resource_name(filename)
         if not resource_name:
             print(f"↪️  Skipping (not a resource doc): {filename}")
             continue
 
-        path = os.path.join(CLEANED_DIR, filename)
-        with open(path, "r", encoding="utf-8") as f:
+        with open(entry.path, "r", encoding="utf-8") as f:
             raw_text = f.read()
 
         required = extract_required_fields(raw_text)
@@ -154,27 +339,59 @@ def process_documents():
 
         required_json = json.dumps(required, ensure_ascii=False)
 
-        # Insert all chunks with the same metadata
+        # All chunks of a file share the same metadata
         for chunk in chunks:
             chunk = chunk.strip()
             if not chunk:
                 continue
-            emb = model.encode(chunk).tolist()
-            doc_id = str(uuid.uuid4())
-            collection.insert([
-                [doc_id],
-                [resource_name],
-                [required_json],
-                [chunk],
-                [emb],
-            ])
-            total_chunks += 1
+            doc_id = chunk_id(resource_name, chunk)
+            if doc_id in seen_ids:
+                continue  # same text twice in one doc: one row is enough
+            seen_ids.add(doc_id)
+            all_chunks.append(chunk)
+            all_meta.append((doc_id, resource_name, required_json))
 
         total_files += 1
-        print(f"   ✅ Stored {len(chunks)} chunks.")
+        print(f"   ✅ Collected {len(chunks)} chunks.")
+
+    if not all_chunks:
+        print("\n⚠️  No chunks to ingest.")
+        return
+
+    # Pass 2: encode everything in batches, then insert
+    print(f"\n🧮 Encoding {len(all_chunks)} chunks (batch_size={EMBED_BATCH_SIZE})...")
+    cache = open_embedding_cache()
+    try:
+        embeddings = embed_chunks(model, all_chunks, cache)
+    finally:
+        cache.close()
+
+    ids = [meta[0] for meta in all_meta]
+    resources = [meta[1] for meta in all_meta]
+    req_jsons = [meta[2] for meta in all_meta]
+
+    # One gRPC round-trip per slab instead of per chunk; upsert keeps re-runs idempotent
+    for i in range(0, len(all_chunks), INSERT_BATCH_SIZE):
+        j = i + INSERT_BATCH_SIZE
+        collection.upsert([
+            ids[i:j],
+            resources[i:j],
+            req_jsons[i:j],
+            all_chunks[i:j],
+            embeddings[i:j],  # float32 ndarray slab; pymilvus packs it without per-float boxing
+        ])
 
     collection.flush()
-    print(f"\n🚀 Ingestion complete. Files: {total_files}, Chunks: {total_chunks}")
+    print(f"\n🚀 Ingestion complete. Files: {total_files}, Chunks: {len(all_chunks)}")
+
+def main():
+    # Connection and model load happen here, not at import, so the helpers above
+    # can be imported (and tested) without Milvus or a multi-GB model.
+    logging.getLogger("pymilvus").setLevel(logging.WARNING)  # no per-insert log spam
+    connections.connect("default", host="localhost", port="19530")
+    model = load_model()
+    collection = ensure_collection()
+    process_documents(model, collection)
 
 if __name__ == "__main__":
-    process_documents()
+    main()
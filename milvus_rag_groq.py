@@ -1,28 +1,40 @@
-# Add these imports to your existing script (after the current imports)
-import subprocess
-import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-# HCL parsing for validation
+# C-accelerated fuzzy matching for resource names (optional)
 try:
-    import hcl2
-    HCL2_AVAILABLE = True
-    print("✅ HCL2 parser loaded successfully")
+    from rapidfuzz import process as rf_process, fuzz as rf_fuzz, utils as rf_utils
+    RAPIDFUZZ_AVAILABLE = True
 except ImportError:
-    HCL2_AVAILABLE = False
-    print("⚠️ HCL2 parser not available")
+    RAPIDFUZZ_AVAILABLE = False
 
 import os
 import re
 import json
 import sys
 import time
+import asyncio
+import atexit
 import difflib
+import functools
+import hashlib
+import pickle
+import random
+import shelve
 from typing import List, Dict, Tuple, Optional
 from pathlib import Path
 
 from pymilvus import connections, Collection
-from groq import Groq
+import httpx
+from groq import Groq, AsyncGroq, APIConnectionError, InternalServerError, RateLimitError
+
+# HTTP/2 for the Groq connection pool when the `h2` extra is installed
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 # ---------------------------
 # Configuration (env-friendly)
@@ -30,16 +42,24 @@ from groq import Groq
 COLLECTION_NAME = os.getenv("MILVUS_COLLECTION", "cloudstack_docs")
 MILVUS_HOST = os.getenv("MILVUS_HOST", "localhost")
 MILVUS_PORT = os.getenv("MILVUS_PORT", "19530")
+MILVUS_CONSISTENCY = os.getenv("MILVUS_CONSISTENCY", "Bounded")  # read-only lookups don't need Strong
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GROQ_MODEL = os.getenv("GROQ_MODEL", "llama3-70b-8192")
 
 MAX_CONTEXT_CHUNKS = int(os.getenv("MAX_CONTEXT_CHUNKS", "8"))
+MAX_CONTEXT_CHARS = int(os.getenv("MAX_CONTEXT_CHARS", "8000"))  # hard cap on doc context sent to Groq
+RESOURCE_MATCH_THRESHOLD = float(os.getenv("RESOURCE_MATCH_THRESHOLD", "88"))  # local match score that skips the LLM
+RESOURCE_MATCH_MARGIN = float(os.getenv("RESOURCE_MATCH_MARGIN", "5"))  # lead over the runner-up required too
+GROQ_CONCURRENCY = int(os.getenv("GROQ_CONCURRENCY", "16"))  # max in-flight async Groq calls
 OUTPUT_DIR = Path(os.getenv("OUTPUT_DIR", "generated"))
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+RAG_CACHE_DIR = OUTPUT_DIR / ".rag_cache"
+FIELD_CACHE_PATH = OUTPUT_DIR / ".field_cache"  # shelve of LLM field details / verdicts, same TTL
+VALUES_CACHE_TTL = int(os.getenv("VALUES_CACHE_TTL", "86400"))  # seconds to offer last run's field values again
+RAG_CACHE_TTL = int(os.getenv("RAG_CACHE_TTL", "3600"))  # seconds; 0 disables the disk cache
 
 TERRAFORM_VALIDATION_ENABLED = os.getenv("TERRAFORM_VALIDATION", "true").lower() == "true"
-VALIDATION_TIMEOUT = int(os.getenv("VALIDATION_TIMEOUT", "60"))  # seconds
 # Quick guard
 if not GROQ_API_KEY:
     print("❌ GROQ_API_KEY is missing. Set it with: setx GROQ_API_KEY \"your_key\" and restart your shell.")
@@ -47,257 +67,95 @@ if not GROQ_API_KEY:
 
 
 
-# Connect clients
-connections.connect("default", host=MILVUS_HOST, port=MILVUS_PORT)
-collection = Collection(COLLECTION_NAME)
-client = Groq(api_key=GROQ_API_KEY, default_headers={"Content-Type": "application/json; charset=utf-8"})
-
-
 # ---------------------------
-# Terraform Validation Functions
+# Compiled patterns (hot paths reuse these instead of re-parsing)
 # ---------------------------
-
-def check_terraform_installed() -> bool:
-    """Check if Terraform CLI is available."""
-    try:
-        result = subprocess.run(['terraform', '--version'], 
-                              capture_output=True, text=True, timeout=10)
-        return result.returncode == 0
-    except (subprocess.TimeoutExpired, FileNotFoundError):
-        return False
-
-def validate_hcl_syntax(hcl_content: str) -> Tuple[bool, str]:
+_JSON_BLOB_RE = re.compile(r"(\{.*\}|\[.*\])", re.DOTALL)
+_OPTIONAL_RE = re.compile(r"([`]?([a-zA-Z0-9_]+)[`]?.{0,40})\((Optional)\)", re.IGNORECASE)
+_OPTION_TOKEN_RE = re.compile(r"[A-Za-z0-9_\-]+")
+_INT_RE = re.compile(r"^-?\d+$")
+_MARKDOWN_FENCE_OPEN = re.compile(r'```(?:hcl|terraform)?\s*\n?')
+_MARKDOWN_FENCE_CLOSE = re.compile(r'```\s*$')
+_MARKDOWN_FENCE_ANY = re.compile(r'```\s*')
+_UNSAFE_NAME_RE = re.compile(r"[^a-zA-Z0-9_\-]+")
+_RESOURCE_BLOCK = re.compile(r'^resource\s+"[^"]+"\s+"[^"]+"\s*\{.*?^\}[ \t]*$', re.DOTALL | re.MULTILINE)
+_MISSING_RE = re.compile(r'^[ \t]*MISSING_REQUIRED:[^\n]*', re.MULTILINE)
+
+@functools.lru_cache(maxsize=1024)
+def _field_default_re(field: str) -> re.Pattern:
+    return re.compile(rf"{re.escape(field)}[^\n]{{0,120}}default[s]?:\s*`?([^`\n,]+)`?", re.IGNORECASE)
+
+@functools.lru_cache(maxsize=1024)
+def _field_options_re(field: str) -> re.Pattern:
+    return re.compile(rf"{re.escape(field)}[^\n]{{0,160}}(valid options|allowed values)[^\n]*:?\s*([^\n]+)", re.IGNORECASE)
+
+@functools.lru_cache(maxsize=1024)
+def _field_example_re(field: str) -> re.Pattern:
+    return re.compile(rf"{re.escape(field)}[^\n]{{0,160}}(?:e\.g\.|for example|example)[^\n:]*[:\-]?\s*`?([A-Za-z0-9_\-\.]+)`?", re.IGNORECASE)
+
+
+# Connect clients (Milvus lazily: warm disk-cache runs never touch the network)
+_collection: Optional[Collection] = None
+
+def get_collection() -> Collection:
+    global _collection
+    if _collection is None:
+        connections.connect("default", host=MILVUS_HOST, port=MILVUS_PORT)
+        collection = Collection(COLLECTION_NAME)
+        # Load up front so the first query doesn't pay the server-side cold load
+        collection.load()
+        _collection = collection
+    return _collection
+
+GROQ_HEADERS = {"Content-Type": "application/json; charset=utf-8"}
+# One pooled keep-alive connection set per process: TLS is negotiated once, not per call
+GROQ_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64)
+GROQ_HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+http_client = httpx.Client(http2=HTTP2_AVAILABLE, limits=GROQ_HTTP_LIMITS, timeout=GROQ_HTTP_TIMEOUT)
+client = Groq(api_key=GROQ_API_KEY, default_headers=GROQ_HEADERS, http_client=http_client)
+# The safe_groq_* helpers do their own backoff; SDK retries underneath would multiply the attempts
+retry_free_client = client.with_options(max_retries=0)
+
+def make_async_groq() -> AsyncGroq:
     """
-    Validate HCL syntax using python-hcl2.
-    Returns (is_valid, error_message)
+    AsyncGroq on its own pooled client; httpx async clients are bound to the running event loop.
+    Only used through safe_groq_json_async, which retries itself: no SDK retries.
     """
-    if not HCL2_AVAILABLE:
-        return True, "HCL2 parser not available - skipping syntax check"
-    
-    try:
-        # Parse the HCL content
-        parsed = hcl2.loads(hcl_content)
-        
-        # Basic structure validation
-        if not isinstance(parsed, dict):
-            return False, "Invalid HCL structure"
-            
-        # Check for required sections
-        has_content = any(key in parsed for key in ['resource', 'terraform', 'provider', 'data'])
-        if not has_content:
-            return False, "No valid Terraform blocks found"
-            
-        return True, "Syntax valid"
-        
-    except Exception as e:
-        error_msg = str(e)
-        if "unexpected token" in error_msg.lower():
-            return False, "Syntax error: Check for missing quotes or brackets"
-        elif "unterminated" in error_msg.lower():
-            return False, "Syntax error: Missing closing quotes or brackets"
-        else:
-            return False, f"Syntax error: {error_msg}"
+    return AsyncGroq(
+        api_key=GROQ_API_KEY,
+        default_headers=GROQ_HEADERS,
+        max_retries=0,
+        http_client=httpx.AsyncClient(http2=HTTP2_AVAILABLE, limits=GROQ_HTTP_LIMITS, timeout=GROQ_HTTP_TIMEOUT),
+    )
 
-def validate_terraform_cli(hcl_content: str) -> Tuple[bool, str]:
-    """
-    Validate using terraform validate command.
-    Returns (is_valid, message)
-    """
-    if not check_terraform_installed():
-        return True, "Terraform CLI not available"
-    
-    with tempfile.TemporaryDirectory() as temp_dir:
-        temp_path = Path(temp_dir)
-        
-        # Write main.tf
-        main_tf = temp_path / "main.tf"
-        with open(main_tf, 'w', encoding='utf-8') as f:
-            f.write(hcl_content)
-        
-        # Write provider.tf
-        provider_tf = temp_path / "provider.tf"
-        with open(provider_tf, 'w', encoding='utf-8') as f:
-            f.write('''
-terraform {
-  required_providers {
-    cloudstack = {
-      source = "cloudstack/cloudstack"
-      version = "~> 0.5"
-    }
-  }
-}
-
-provider "cloudstack" {
-  api_url    = "http://localhost:8080/client/api"
-  api_key    = "dummy"
-  secret_key = "dummy"
-}
-''')
-        
-        try:
-            # Initialize Terraform
-            init_result = subprocess.run(
-                ['terraform', 'init', '-no-color'],
-                cwd=temp_dir,
-                capture_output=True,
-                text=True,
-                timeout=VALIDATION_TIMEOUT
-            )
-            
-            if init_result.returncode != 0:
-                if "Error parsing" in init_result.stderr:
-                    return False, f"Parse error: {init_result.stderr}"
-                # Other init errors might be OK (network issues, etc.)
-            
-            # Run terraform validate
-            validate_result = subprocess.run(
-                ['terraform', 'validate', '-no-color'],
-                cwd=temp_dir,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            
-            if validate_result.returncode == 0:
-                return True, "Terraform validation passed"
-            else:
-                return False, f"Validation failed: {validate_result.stderr}"
-                
-        except subprocess.TimeoutExpired:
-            return False, "Validation timed out"
-        except Exception as e:
-            return False, f"Validation error: {str(e)}"
 
-def validate_required_fields(hcl_content: str, required_fields: List[str]) -> Tuple[bool, List[str]]:
-    """
-    Check if all required fields are present.
-    Returns (all_present, missing_fields)
-    """
-    missing = []
-    
-    for field in required_fields:
-        # Look for field = value pattern
-        pattern = rf'\b{re.escape(field)}\s*='
-        if not re.search(pattern, hcl_content):
-            missing.append(field)
-    
-    return len(missing) == 0, missing
+# ---------------------------
+# Utility: Robust LLM JSON
+# ---------------------------
+_NO_JSON = object()
 
-def comprehensive_terraform_validation(hcl_content: str, required_fields: List[str]) -> Dict[str, any]:
-    """
-    Run all validation checks.
-    Returns comprehensive results dictionary.
-    """
-    if not TERRAFORM_VALIDATION_ENABLED:
-        return {'overall_valid': True, 'message': 'Validation disabled'}
-    
-    results = {
-        'overall_valid': True,
-        'syntax_check': {'valid': True, 'message': ''},
-        'terraform_cli': {'valid': True, 'message': ''},
-        'required_fields': {'valid': True, 'missing': []},
-        'suggestions': []
-    }
-    
-    # Initialize variables to avoid UnboundLocalError
-    syntax_valid = True
-    cli_valid = True
-    cli_msg = ""
-    
-    # 1. HCL Syntax Check
+def _parse_llm_json(raw: str):
+    """Parse raw LLM text as JSON, else the first JSON-looking substring; _NO_JSON if neither."""
+    # Try direct JSON parse
     try:
-        syntax_valid, syntax_msg = validate_hcl_syntax(hcl_content)
-        results['syntax_check'] = {'valid': syntax_valid, 'message': syntax_msg}
-        if not syntax_valid:
-            results['overall_valid'] = False
-    except Exception as e:
-        syntax_valid = False
-        results['syntax_check'] = {'valid': False, 'message': f"Syntax validation error: {str(e)}"}
-        results['overall_valid'] = False
-    
-    # 2. Required Fields Check
-    try:
-        fields_valid, missing_fields = validate_required_fields(hcl_content, required_fields)
-        results['required_fields'] = {'valid': fields_valid, 'missing': missing_fields}
-        if not fields_valid:
-            results['overall_valid'] = False
-    except Exception as e:
-        results['required_fields'] = {'valid': False, 'missing': [f"Error checking fields: {str(e)}"]}
-        results['overall_valid'] = False
-    
-    # 3. Terraform CLI Validation (only if syntax is OK)
-    if syntax_valid:
-        try:
-            cli_valid, cli_msg = validate_terraform_cli(hcl_content)
-            results['terraform_cli'] = {'valid': cli_valid, 'message': cli_msg}
-            if not cli_valid and "not available" not in cli_msg:
-                results['overall_valid'] = False
-        except Exception as e:
-            cli_valid = False
-            cli_msg = f"CLI validation error: {str(e)}"
-            results['terraform_cli'] = {'valid': False, 'message': cli_msg}
-            results['overall_valid'] = False
-    else:
-        # Skip CLI validation if syntax is invalid
-        results['terraform_cli'] = {'valid': True, 'message': 'Skipped due to syntax errors'}
-    
-    # 4. Generate suggestions
-    suggestions = []
-    if not syntax_valid:
-        suggestions.append("Fix HCL syntax errors")
-    if results['required_fields'].get('missing'):
-        missing = results['required_fields']['missing']
-        suggestions.append(f"Add missing required fields: {', '.join(missing)}")
-    if not cli_valid and "not available" not in cli_msg:
-        suggestions.append("Review Terraform validation errors")
-    
-    results['suggestions'] = suggestions
-    
-    return results
-def print_validation_results(results: Dict[str, any]):
-    """Display validation results in a user-friendly format."""
-    if not TERRAFORM_VALIDATION_ENABLED:
-        return
-        
-    print("\n📋 Validation Results:")
-    print("=" * 40)
-    
-    # Overall status
-    if results['overall_valid']:
-        print("✅ Overall Status: VALID")
-    else:
-        print("❌ Overall Status: INVALID")
-    
-    # Syntax check
-    syntax = results.get('syntax_check', {})
-    status_icon = "✅" if syntax.get('valid') else "❌"
-    print(f"{status_icon} HCL Syntax: {syntax.get('message', 'Unknown')}")
-    
-    # Required fields
-    fields = results.get('required_fields', {})
-    if fields.get('missing'):
-        print(f"❌ Required Fields: Missing {fields['missing']}")
-    else:
-        print("✅ Required Fields: All present")
-    
-    # Terraform CLI
-    cli = results.get('terraform_cli', {})
-    status_icon = "✅" if cli.get('valid') else "❌"
-    cli_msg = cli.get('message', 'Unknown')
-    print(f"{status_icon} Terraform CLI: {cli_msg}")
-    
-    # Suggestions
-    if results.get('suggestions'):
-        print("\n💡 Suggestions:")
-        for i, suggestion in enumerate(results['suggestions'], 1):
-            print(f"   {i}. {suggestion}")
-    
-    print("=" * 40)
+        return json.loads(raw)
+    except Exception:
+        # Try to find JSON-like substring
+        m = _JSON_BLOB_RE.search(raw)
+        if m:
+            try:
+                return json.loads(m.group(1))
+            except Exception:
+                pass
+    return _NO_JSON
 
+# Transient failures worth retrying; anything else (bad request, auth...) fails fast
+_RETRYABLE_GROQ_ERRORS = (RateLimitError, InternalServerError, APIConnectionError)
+
+def _retry_delay(attempt: int) -> float:
+    """Exponential backoff with jitter, capped at 8s."""
+    return min(2 ** attempt + random.random(), 8.0)
 
-# ---------------------------
-# Utility: Robust LLM JSON
-# ---------------------------
 def safe_groq_json(prompt: str, default=None, retries: int = 1):
     """
     Ask Groq for JSON. If parsing fails, try to extract JSON substring.
@@ -305,28 +163,40 @@ def safe_groq_json(prompt: str, default=None, retries: int = 1):
     """
     for attempt in range(retries + 1):
         try:
-            resp = client.chat.completions.create(
+            resp = retry_free_client.chat.completions.create(
                 model=GROQ_MODEL,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0
             )
-            raw = resp.choices[0].message.content.strip()
-            # Try direct JSON parse
-            try:
-                return json.loads(raw)
-            except Exception:
-                # Try to find JSON-like substring
-                m = re.search(r"(\{.*\}|\[.*\])", raw, flags=re.DOTALL)
-                if m:
-                    try:
-                        return json.loads(m.group(1))
-                    except Exception:
-                        pass
+            parsed = _parse_llm_json(resp.choices[0].message.content.strip())
+            if parsed is not _NO_JSON:
+                return parsed
             # if here, parsing failed for this attempt
-        except Exception as e:
-            # network/LLM error, allow retry
-            # small backoff
-            time.sleep(0.3)
+        except _RETRYABLE_GROQ_ERRORS:
+            # rate limit / 5xx / network: back off and retry
+            if attempt < retries:
+                time.sleep(_retry_delay(attempt))
+        except Exception:
+            break  # other API/client errors won't fix themselves
+    return default
+
+async def safe_groq_json_async(aclient: AsyncGroq, prompt: str, default=None, retries: int = 1):
+    """Async twin of safe_groq_json, so independent prompts can be in flight together."""
+    for attempt in range(retries + 1):
+        try:
+            resp = await aclient.chat.completions.create(
+                model=GROQ_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0
+            )
+            parsed = _parse_llm_json(resp.choices[0].message.content.strip())
+            if parsed is not _NO_JSON:
+                return parsed
+        except _RETRYABLE_GROQ_ERRORS:
+            if attempt < retries:
+                await asyncio.sleep(_retry_delay(attempt))
+        except Exception:
+            break
     return default
 
 def safe_groq_text(prompt: str, default="", retries: int = 1) -> str:
@@ -335,24 +205,75 @@ def safe_groq_text(prompt: str, default="", retries: int = 1) -> str:
     """
     for attempt in range(retries + 1):
         try:
-            resp = client.chat.completions.create(
+            resp = retry_free_client.chat.completions.create(
                 model=GROQ_MODEL,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.0
             )
             return resp.choices[0].message.content.strip()
+        except _RETRYABLE_GROQ_ERRORS:
+            if attempt < retries:
+                time.sleep(_retry_delay(attempt))
         except Exception:
-            time.sleep(0.3)
+            break
     return default
 
+# ---------------------------
+# On-disk cache (survives across CLI runs)
+# ---------------------------
+def _cache_path(kind: str, key: str) -> Path:
+    namespace = f"{MILVUS_HOST}:{MILVUS_PORT}/{COLLECTION_NAME}/{key}"
+    digest = hashlib.blake2b(namespace.encode("utf-8"), digest_size=16).hexdigest()
+    return RAG_CACHE_DIR / f"{kind}_{digest}.pkl"
+
+def _disk_cache_load(path: Path, ttl: Optional[int] = None):
+    """Return the pickled value if the file is younger than ttl (default RAG_CACHE_TTL), else None."""
+    ttl = RAG_CACHE_TTL if ttl is None else ttl
+    if ttl <= 0:
+        return None
+    try:
+        if time.time() - path.stat().st_mtime >= ttl:
+            return None
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception:
+        return None
+
+def _disk_cache_store(path: Path, value, ttl: Optional[int] = None) -> None:
+    if (RAG_CACHE_TTL if ttl is None else ttl) <= 0:
+        return
+    try:
+        RAG_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)  # atomic: concurrent runs never read a half-written file
+    except Exception:
+        pass  # cache is best-effort
+
+
 # ---------------------------
 # Resource mapping
 # ---------------------------
+@functools.lru_cache(maxsize=1)
+def _fetch_resources(limit: int) -> Tuple[str, ...]:
+    path = _cache_path("resources", str(limit))
+    cached = _disk_cache_load(path)
+    if cached is not None:
+        return cached
+    # Raises on query errors so failures are never cached
+    results = get_collection().query(
+        expr='resource != ""', output_fields=["resource"], limit=limit, consistency_level=MILVUS_CONSISTENCY
+    )
+    resources = tuple(sorted({r["resource"] for r in results if r.get("resource")}))
+    if resources:
+        _disk_cache_store(path, resources)
+    return resources
+
 def list_available_resources(limit: int = 10000) -> List[str]:
-    """Read distinct resource names from Milvus (best-effort via query)."""
+    """Read distinct resource names from Milvus (best-effort via query, cached per process)."""
     try:
-        results = collection.query(expr='resource != ""', output_fields=["resource"], limit=limit)
-        return sorted({r["resource"] for r in results if r.get("resource")})
+        return list(_fetch_resources(limit))
     except Exception as e:
         # fallback to empty
         return []
@@ -360,17 +281,19 @@ def list_available_resources(limit: int = 10000) -> List[str]:
 def best_fuzzy_match(query: str, candidates: List[str]) -> Optional[str]:
     if not candidates:
         return None
-    lowered = [c.lower() for c in candidates]
+    # lowercase -> first original spelling; one pass over candidates
+    lower_to_orig: Dict[str, str] = {}
+    for c in candidates:
+        lower_to_orig.setdefault(c.lower(), c)
     # try direct token matches
     q = query.lower()
-    for c in candidates:
-        if q in c.lower() or c.lower() in q:
-            return c
+    for lc, orig in lower_to_orig.items():
+        if q in lc or lc in q:
+            return orig
     # difflib
-    matches = difflib.get_close_matches(q, lowered, n=1, cutoff=0.6)
+    matches = difflib.get_close_matches(q, list(lower_to_orig), n=1, cutoff=0.6)
     if matches:
-        idx = lowered.index(matches[0])
-        return candidates[idx]
+        return lower_to_orig[matches[0]]
     # try cloudstack_ prefix
     if not q.startswith("cloudstack_"):
         matches = difflib.get_close_matches("cloudstack_" + q, candidates, n=1, cutoff=0.6)
@@ -378,18 +301,55 @@ def best_fuzzy_match(query: str, candidates: List[str]) -> Optional[str]:
             return matches[0]
     return None
 
+@functools.lru_cache(maxsize=4)
+def _resource_index(known: Tuple[str, ...]) -> frozenset:
+    # Built once per resource list; lookups below are O(1)
+    return frozenset(known)
+
+@functools.lru_cache(maxsize=4)
+def _resource_short_names(known: Tuple[str, ...]) -> Tuple[str, ...]:
+    # Scored without the shared prefix, which would inflate every short query
+    return tuple(r[len("cloudstack_"):] if r.startswith("cloudstack_") else r for r in known)
+
+def local_resource_match(user_input: str, known: Tuple[str, ...]) -> Optional[str]:
+    """Confident local match (exact name or high fuzzy score), else None."""
+    q = "_".join(user_input.lower().split())  # "load balancer" -> "load_balancer"
+    index = _resource_index(known)
+    for candidate in (q, "cloudstack_" + q):
+        if candidate in index:
+            return candidate
+    if RAPIDFUZZ_AVAILABLE:
+        # Whole-name scorer: a partial-ratio one rates every substring ("group", "rule") at 90.
+        # Ambiguous queries, where the runner-up is close, are left to the LLM.
+        top = rf_process.extract(
+            q[len("cloudstack_"):] if q.startswith("cloudstack_") else q,
+            _resource_short_names(known),
+            scorer=rf_fuzz.token_sort_ratio,
+            processor=rf_utils.default_process,
+            limit=2,
+        )
+        if top and top[0][1] >= RESOURCE_MATCH_THRESHOLD:
+            if len(top) == 1 or top[0][1] - top[1][1] >= RESOURCE_MATCH_MARGIN:
+                return known[top[0][2]]
+    return None
+
 def normalize_resource_query(user_input: str) -> Optional[str]:
     """
     Resolve natural user request into a canonical resource (cloudstack_xxx).
     Strategy:
-      1) Ask Groq (with list of known resources) for best match.
-      2) Fallback to fuzzy local heuristics.
+      1) Confident local match (exact / rapidfuzz), no network call.
+      2) Ask Groq (with list of known resources) for best match.
+      3) Fallback to fuzzy local heuristics.
     """
     known = list_available_resources()
     if not known:
         print("⚠ No resources found in Milvus index (cloudstack_docs). Did you ingest docs?") 
         return None
 
+    local = local_resource_match(user_input, tuple(known))
+    if local:
+        return local
+
     # Ask LLM to select from list
     sys_prompt = "You map a user's natural-language request to one of the exact resource names listed below.\nReturn ONLY a single exact resource name that appears in the list. If unsure, pick the best match."
     user_prompt = f"User: \"{user_input}\"\nResources:\n" + "\n".join(known)
@@ -423,41 +383,83 @@ def normalize_resource_query(user_input: str) -> Optional[str]:
 # ---------------------------
 # RAG: get docs + required fields
 # ---------------------------
-def search_docs(resource_name: str) -> Tuple[List[str], List[str]]:
+QUERY_BATCH_SIZE = 1000
+QUERY_MAX_ROWS = 16000  # hard safety stop, same window as the paged loop
+
+def _query_all(collection, expr: str, output_fields: List[str]) -> Tuple[List[dict], bool]:
     """
-    Return all doc chunks and required fields for a given resource.
-    Handles Milvus query window limit by fetching in batches.
+    Fetch every row matching expr.
+    Streams through query_iterator (one server-side cursor, pymilvus >= 2.3);
+    falls back to offset paging on older clients/servers.
+    Returns (rows, complete): complete is False when a query error cut the fetch short.
     """
-    expr = f'resource == "{resource_name}"'
-    batch_size = 1000
-    offset = 0
+    try:
+        it = collection.query_iterator(
+            expr=expr,
+            output_fields=output_fields,
+            batch_size=QUERY_BATCH_SIZE,
+            limit=QUERY_MAX_ROWS,
+            consistency_level=MILVUS_CONSISTENCY,
+        )
+    except Exception:
+        it = None
+
     all_results = []
+    if it is not None:
+        complete = True
+        try:
+            while True:
+                batch = it.next()
+                if not batch:
+                    break
+                all_results.extend(batch)
+        except Exception:
+            complete = False  # keep what was streamed, same as the paged loop on errors
+        finally:
+            try:
+                it.close()
+            except Exception:
+                pass
+        return all_results, complete
 
-    while True:
+    offset = 0
+    while offset < QUERY_MAX_ROWS:
         try:
             results = collection.query(
                 expr=expr,
-                output_fields=["text", "required_fields"],
-                limit=batch_size,
-                offset=offset
+                output_fields=output_fields,
+                limit=QUERY_BATCH_SIZE,
+                offset=offset,
+                consistency_level=MILVUS_CONSISTENCY
             )
-        except Exception as e:
-            break  # stop if we reach end or other query issue
+        except Exception:
+            return all_results, False  # query issue: partial at best
 
         if not results:
             break
 
         all_results.extend(results)
 
-        # If less than batch_size returned, no more data
-        if len(results) < batch_size:
+        # If less than a full batch returned, no more data
+        if len(results) < QUERY_BATCH_SIZE:
             break
 
-        offset += batch_size
+        offset += QUERY_BATCH_SIZE
+    return all_results, True
 
-        # Hard safety stop to avoid infinite loops
-        if offset >= 16000:
-            break
+@functools.lru_cache(maxsize=128)
+def _fetch_docs(resource_name: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """
+    Return all doc chunks and required fields for a given resource.
+    Handles Milvus query window limit by fetching in batches.
+    """
+    path = _cache_path("docs", resource_name)
+    cached = _disk_cache_load(path)
+    if cached is not None:
+        return cached
+
+    expr = f'resource == "{resource_name}"'
+    all_results, complete = _query_all(get_collection(), expr, ["text", "required_fields"])
 
     # Collect chunks
     chunks = [r["text"] for r in all_results if r.get("text")]
@@ -472,18 +474,55 @@ def search_docs(resource_name: str) -> Tuple[List[str], List[str]]:
                     break
             except Exception:
                 pass
-    return chunks, required
+    chunks = rank_doc_chunks(chunks, required)
+    result = (tuple(chunks), tuple(required))
+    # A fetch cut short by a query error is used for this run only, never persisted
+    if chunks and complete:
+        _disk_cache_store(path, result)
+    return result
+
+def rank_doc_chunks(chunks: List[str], required: List[str]) -> List[str]:
+    """
+    Drop repeated chunks (same Argument Reference table ingested twice, ...) and
+    put the ones mentioning the most required fields first.
+    """
+    seen = set()
+    unique = []
+    for c in chunks:
+        h = hashlib.blake2b(c.encode("utf-8"), digest_size=16).digest()
+        if h not in seen:
+            seen.add(h)
+            unique.append(c)
+    # Stable: equally relevant chunks keep their Milvus order
+    unique.sort(key=lambda c: sum(1 for f in required if f in c), reverse=True)
+    return unique
+
+def build_context(docs_chunks: List[str], separator: str = "\n\n") -> str:
+    """Top MAX_CONTEXT_CHUNKS chunks, capped at MAX_CONTEXT_CHARS characters."""
+    return separator.join(docs_chunks[:MAX_CONTEXT_CHUNKS])[:MAX_CONTEXT_CHARS]
+
+def search_docs(resource_name: str) -> Tuple[List[str], List[str]]:
+    """Cached per process: retries and repeat lookups skip the Milvus round-trips."""
+    chunks, required = _fetch_docs(resource_name)
+    return list(chunks), list(required)
+
+def clear_milvus_caches():
+    """Drop cached resource lists and doc lookups (e.g. after re-ingesting)."""
+    _fetch_resources.cache_clear()
+    _fetch_docs.cache_clear()
+    if RAG_CACHE_DIR.is_dir():
+        for p in [*RAG_CACHE_DIR.glob("resources_*.pkl"), *RAG_CACHE_DIR.glob("docs_*.pkl")]:
+            try:
+                p.unlink()
+            except OSError:
+                pass
 
 
 # ---------------------------
 # Optional fields extraction (robust)
 # ---------------------------
-def extract_optional_fields_from_docs(docs_text: str, required_fields: List[str]) -> List[str]:
-    """
-    Ask LLM to list optional fields, fallback to regex parsing.
-    Returns a list of field names (strings).
-    """
-    prompt = f"""
+def _optional_fields_prompt(docs_text: str, required_fields: List[str]) -> str:
+    return f"""
 Extract OPTIONAL argument/field names from the following Terraform CloudStack documentation.
 Return ONLY a JSON array of strings, e.g. ["field1","field2"].
 Exclude required fields: {required_fields}
@@ -491,7 +530,21 @@ Exclude required fields: {required_fields}
 Docs:
 {docs_text}
 """
-    result = safe_groq_json(prompt, default=None, retries=1)
+
+def extract_optional_fields_from_docs(docs_text: str, required_fields: List[str]) -> List[str]:
+    """
+    Ask LLM to list optional fields, fallback to regex parsing.
+    Returns a list of field names (strings).
+    """
+    result = safe_groq_json(_optional_fields_prompt(docs_text, required_fields), default=None, retries=1)
+    return _optional_fields_from_result(result, docs_text, required_fields)
+
+async def extract_optional_fields_from_docs_async(aclient: AsyncGroq, docs_text: str, required_fields: List[str]) -> List[str]:
+    """Async twin of extract_optional_fields_from_docs on the caller's client."""
+    result = await safe_groq_json_async(aclient, _optional_fields_prompt(docs_text, required_fields))
+    return _optional_fields_from_result(result, docs_text, required_fields)
+
+def _optional_fields_from_result(result, docs_text: str, required_fields: List[str]) -> List[str]:
     if isinstance(result, list):
         # ensure strings and filter duplicates
         return sorted({s for s in result if isinstance(s, str) and s not in required_fields})
@@ -500,54 +553,206 @@ Docs:
     # Look only in Argument Reference sections (common pattern)
     section = docs_text
     # naive scan for "(Optional)" tokens, capture field token to left
-    for m in re.finditer(r"([`]?([a-zA-Z0-9_]+)[`]?.{0,40})\((Optional)\)", section, flags=re.IGNORECASE):
+    for m in _OPTIONAL_RE.finditer(section):
         name = m.group(2)
         if name and (name not in required_fields):
             optional.add(name)
     return sorted(optional)
 
+# ---------------------------
+# Field LLM answer cache (memory in front of a shelve on disk)
+# ---------------------------
+_field_memo: Dict[str, object] = {}
+_field_shelf = None
+_field_shelf_failed = False
+_field_shelf_lock = threading.Lock()
+
+def _open_field_shelf():
+    """The shelf, or None when it can't be opened (memory-only for this run)."""
+    global _field_shelf, _field_shelf_failed
+    if _field_shelf is None and not _field_shelf_failed:
+        try:
+            _field_shelf = shelve.open(str(FIELD_CACHE_PATH))
+            atexit.register(_field_shelf.close)
+        except Exception:
+            _field_shelf_failed = True
+    return _field_shelf
+
+@functools.lru_cache(maxsize=8)
+def _docs_digest(docs_text: str) -> str:
+    return hashlib.blake2b(docs_text.encode("utf-8"), digest_size=16).hexdigest()
+
+def _field_cache_key(kind: str, field: str, docs_text: str, value: str = "") -> str:
+    raw = f"{kind}|{GROQ_MODEL}|{field}|{_docs_digest(docs_text)}|{value}"
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+def _field_cache_get(key: str):
+    """Cached LLM answer or None (missing / older than RAG_CACHE_TTL)."""
+    if RAG_CACHE_TTL <= 0:
+        return None
+    if key in _field_memo:
+        return _field_memo[key]
+    with _field_shelf_lock:
+        shelf = _open_field_shelf()
+        entry = shelf.get(key) if shelf is not None else None
+    if entry is None or time.time() - entry[0] >= RAG_CACHE_TTL:
+        return None
+    _field_memo[key] = entry[1]
+    return entry[1]
+
+def _field_cache_set(key: str, value) -> None:
+    if RAG_CACHE_TTL <= 0:
+        return
+    _field_memo[key] = value
+    with _field_shelf_lock:
+        shelf = _open_field_shelf()
+        if shelf is not None:
+            try:
+                shelf[key] = (time.time(), value)
+            except Exception:
+                pass
+
+
 # ---------------------------
 # Field suggestions and heuristics
 # ---------------------------
-def suggest_field_details(field: str, docs_text: str) -> Dict[str, Optional[object]]:
-    """
-    Ask LLM for type/example/default/options for a field. Safe fallback to regex heuristics.
-    Returns a dict: {type, example, default, options}
-    """
-    prompt = f"""
-You are given Terraform CloudStack documentation text. For the field name '{field}', return a JSON object:
-{{"type": "...", "example": "...", "default": "...", "options": ["opt1","opt2"]}}
-Use null for unknowns. Return ONLY JSON.
-Docs:
-{docs_text}
-"""
-    result = safe_groq_json(prompt, default=None, retries=1)
-    if isinstance(result, dict):
-        # normalize keys
-        return {
-            "type": result.get("type"),
-            "example": result.get("example"),
-            "default": result.get("default"),
-            "options": result.get("options"),
-        }
+def _normalize_details(result: Dict) -> Dict[str, Optional[object]]:
+    return {
+        "type": result.get("type"),
+        "example": result.get("example"),
+        "default": result.get("default"),
+        "options": result.get("options"),
+    }
+
+def _heuristic_field_details(field: str, docs_text: str) -> Dict[str, Optional[object]]:
     # Fallback heuristics (very conservative)
     details = {"type": None, "example": None, "default": None, "options": None}
     # Try to find "Default: X" or "Defaults to X" patterns
-    m = re.search(rf"{re.escape(field)}[^\n]{{0,120}}default[s]?:\s*`?([^`\n,]+)`?", docs_text, flags=re.IGNORECASE)
+    m = _field_default_re(field).search(docs_text)
     if m:
         details["default"] = m.group(1).strip()
     # Try to discover options like "Valid options are X, Y, Z"
-    m2 = re.search(rf"{re.escape(field)}[^\n]{{0,160}}(valid options|allowed values)[^\n]*:?\s*([^\n]+)", docs_text, flags=re.IGNORECASE)
+    m2 = _field_options_re(field).search(docs_text)
     if m2:
-        opts = re.findall(r"[A-Za-z0-9_\-]+", m2.group(2))
+        opts = _OPTION_TOKEN_RE.findall(m2.group(2))
         if opts:
             details["options"] = opts
     # Find examples like "e.g., ubuntu-20.04" or "`ubuntu-20.04`"
-    m3 = re.search(rf"{re.escape(field)}[^\n]{{0,160}}(?:e\.g\.|for example|example)[^\n:]*[:\-]?\s*`?([A-Za-z0-9_\-\.]+)`?", docs_text, flags=re.IGNORECASE)
+    m3 = _field_example_re(field).search(docs_text)
     if m3:
         details["example"] = m3.group(1).strip()
     return details
 
+def _field_details_prompt(field: str, docs_text: str) -> str:
+    return f"""
+You are given Terraform CloudStack documentation text. For the field name '{field}', return a JSON object:
+{{"type": "...", "example": "...", "default": "...", "options": ["opt1","opt2"]}}
+Use null for unknowns. Return ONLY JSON.
+Docs:
+{docs_text}
+"""
+
+def suggest_field_details(field: str, docs_text: str) -> Dict[str, Optional[object]]:
+    """
+    Ask LLM for type/example/default/options for a field. Safe fallback to regex heuristics.
+    Returns a dict: {type, example, default, options}
+    """
+    key = _field_cache_key("details", field, docs_text)
+    cached = _field_cache_get(key)
+    if cached is not None:
+        return dict(cached)
+    result = safe_groq_json(_field_details_prompt(field, docs_text), default=None, retries=1)
+    if isinstance(result, dict):
+        details = _normalize_details(result)
+        _field_cache_set(key, details)
+        return details
+    return _heuristic_field_details(field, docs_text)
+
+async def suggest_all_field_details_async(fields: List[str], docs_text: str) -> Dict[str, Dict[str, Optional[object]]]:
+    """
+    Per-field suggest_field_details prompts, issued concurrently
+    (at most GROQ_CONCURRENCY in flight). Failures fall back to heuristics.
+    """
+    async with make_async_groq() as aclient:
+        return await _field_details_each_async(aclient, fields, docs_text)
+
+async def _field_details_each_async(aclient: AsyncGroq, fields: List[str], docs_text: str) -> Dict[str, Dict[str, Optional[object]]]:
+    sem = asyncio.Semaphore(GROQ_CONCURRENCY)
+
+    async def one(field: str):
+        async with sem:
+            return await safe_groq_json_async(aclient, _field_details_prompt(field, docs_text))
+
+    results = await asyncio.gather(*(one(f) for f in fields), return_exceptions=True)
+
+    details_map = {}
+    for f, r in zip(fields, results):
+        if isinstance(r, dict):
+            details_map[f] = _normalize_details(r)
+            _field_cache_set(_field_cache_key("details", f, docs_text), details_map[f])
+        else:
+            details_map[f] = _heuristic_field_details(f, docs_text)
+    return details_map
+
+def suggest_all_field_details(fields: List[str], docs_text: str) -> Dict[str, Dict[str, Optional[object]]]:
+    """
+    Same as suggest_field_details, but for every field in ONE Groq call.
+    Fields missing from the LLM answer are retried concurrently, one prompt each.
+    Returns a dict: field -> {type, example, default, options}
+    """
+    if not fields:
+        return {}
+    details_map, todo = _cached_field_details(fields, docs_text)
+    if not todo:
+        return details_map
+    result = safe_groq_json(_all_field_details_prompt(todo, docs_text), default=None, retries=1)
+    missing = _store_batched_details(result, todo, docs_text, details_map)
+    if missing:
+        details_map.update(asyncio.run(suggest_all_field_details_async(missing, docs_text)))
+    return {f: details_map[f] for f in fields}
+
+async def suggest_all_field_details_batched_async(aclient: AsyncGroq, fields: List[str], docs_text: str) -> Dict[str, Dict[str, Optional[object]]]:
+    """Async twin of suggest_all_field_details on the caller's client."""
+    if not fields:
+        return {}
+    details_map, todo = _cached_field_details(fields, docs_text)
+    if not todo:
+        return details_map
+    result = await safe_groq_json_async(aclient, _all_field_details_prompt(todo, docs_text))
+    missing = _store_batched_details(result, todo, docs_text, details_map)
+    if missing:
+        details_map.update(await _field_details_each_async(aclient, missing, docs_text))
+    return {f: details_map[f] for f in fields}
+
+def _cached_field_details(fields: List[str], docs_text: str) -> Tuple[Dict[str, Dict[str, Optional[object]]], List[str]]:
+    # Fields answered on a previous run with the same docs skip the LLM
+    details_map = {}
+    for f in fields:
+        cached = _field_cache_get(_field_cache_key("details", f, docs_text))
+        if cached is not None:
+            details_map[f] = dict(cached)
+    return details_map, [f for f in fields if f not in details_map]
+
+def _all_field_details_prompt(fields: List[str], docs_text: str) -> str:
+    return f"""
+You are given Terraform CloudStack documentation text. For EACH of these field names: {fields}
+return ONE JSON object mapping the field name to:
+{{"type": "...", "example": "...", "default": "...", "options": ["opt1","opt2"]}}
+Use null for unknowns. Return ONLY JSON.
+Docs:
+{docs_text}
+"""
+
+def _store_batched_details(result, todo: List[str], docs_text: str, details_map: Dict) -> List[str]:
+    """Move the fields answered in `result` into details_map (and the cache); returns the rest."""
+    if not isinstance(result, dict):
+        result = {}
+    for f in todo:
+        if isinstance(result.get(f), dict):
+            details_map[f] = _normalize_details(result[f])
+            _field_cache_set(_field_cache_key("details", f, docs_text), details_map[f])
+    return [f for f in todo if f not in details_map]
+
 # ---------------------------
 # Field validation (LLM + heuristic fallback)
 # ---------------------------
@@ -572,7 +777,15 @@ Decide whether the following value is VALID for the Terraform field '{field}'. R
 Field: {field}
 Value: {value}
 """
-    text = safe_groq_text(prompt, default="invalid", retries=1).lower()
+    key = _field_cache_key("verdict", field, docs_text, str(value))
+    text = _field_cache_get(key)
+    if text is None:
+        text = safe_groq_text(prompt, default=None, retries=1)
+        if text is None:
+            text = "invalid"  # LLM unreachable: not cached, heuristics below decide
+        else:
+            _field_cache_set(key, text)
+    text = text.lower()
     if "valid" in text and "invalid" not in text:
         return True, ""
     if "invalid" in text and "valid" not in text:
@@ -590,7 +803,7 @@ Value: {value}
     if typ:
         t = (typ or "").lower()
         if "int" in t or "number" in t:
-            if re.fullmatch(r"^-?\d+$", value):
+            if _INT_RE.fullmatch(value):
                 return True, ""
             else:
                 return False, "not an integer"
@@ -605,17 +818,30 @@ Value: {value}
 # ---------------------------
 # User input flow with suggestions + validation
 # ---------------------------
-def prompt_for_fields(fields: List[str], docs_text: str, required: bool = True) -> Dict[str, str]:
+async def _prefetch_field_info(docs_text: str, required_fields: List[str]):
+    """Optional-field list and required-field details don't depend on each other: fetch them together."""
+    async with make_async_groq() as aclient:
+        return await asyncio.gather(
+            extract_optional_fields_from_docs_async(aclient, docs_text, required_fields),
+            suggest_all_field_details_batched_async(aclient, required_fields, docs_text),
+        )
+
+def prompt_for_fields(fields: List[str], docs_text: str, required: bool = True,
+                      details_map: Optional[Dict[str, Dict[str, Optional[object]]]] = None) -> Dict[str, str]:
     """
     For each field:
       - get details (example/default/options)
       - prompt user showing suggestions
       - validate input (repeat until valid or user chooses to skip for optional)
+    details_map: suggestions already fetched by the caller (skips the lookup)
     Returns dict field->value for those provided (required fields must be valid)
     """
     out = {}
+    # One LLM round-trip for all fields instead of one per field
+    if details_map is None:
+        details_map = suggest_all_field_details(fields, docs_text)
     for f in fields:
-        details = suggest_field_details(f, docs_text)
+        details = details_map.get(f, {})
         suggestion_parts = []
         if details.get("default"):
             suggestion_parts.append(f"default={details['default']}")
@@ -655,7 +881,7 @@ def prompt_for_fields(fields: List[str], docs_text: str, required: bool = True)
 # ---------------------------
 # Generation: final terraform HCL
 # ---------------------------
-def generate_terraform_hcl(resource_name: str, docs_chunks: List[str], provided_values: Dict[str,str], required_fields: List[str]) -> str:
+def generate_terraform_hcl(resource_name: str, docs_chunks: List[str], provided_values: Dict[str,str], required_fields: List[str], stream: bool = False) -> str:
     """
     Build a careful prompt that enforces:
       - Use only provider cloudstack/cloudstack
@@ -663,8 +889,9 @@ def generate_terraform_hcl(resource_name: str, docs_chunks: List[str], provided_
       - If some required field still missing, LLM must return a single-line comment:
         MISSING_REQUIRED:<field>
       - Return ONLY pure HCL code without markdown formatting
+    With stream=True the tokens are echoed to stdout as they arrive.
     """
-    context = "\n\n---\n\n".join(docs_chunks[:MAX_CONTEXT_CHUNKS])
+    context = build_context(docs_chunks, "\n\n---\n\n")
     sys_msg = (
         "You are an expert Terraform generator for the CloudStack provider.\n"
         "Produce ONLY valid Terraform HCL for a single resource of the requested type.\n"
@@ -696,9 +923,21 @@ Output: ONLY raw Terraform HCL code (no prose, no markdown, no code fences). If
         resp = client.chat.completions.create(
             model=GROQ_MODEL,
             messages=[{"role":"system", "content": sys_msg}, {"role":"user", "content": user_msg}],
-            temperature=0.1
+            temperature=0.1,
+            stream=stream
         )
-        raw_output = resp.choices[0].message.content.strip()
+        if stream:
+            buf = []
+            for chunk in resp:
+                piece = chunk.choices[0].delta.content if chunk.choices else None
+                if piece:
+                    buf.append(piece)
+                    sys.stdout.write(piece)
+                    sys.stdout.flush()
+            sys.stdout.write("\n")
+            raw_output = "".join(buf).strip()
+        else:
+            raw_output = resp.choices[0].message.content.strip()
         
         # Clean up any markdown formatting that might have slipped through
         cleaned_output = clean_terraform_output(raw_output)
@@ -708,29 +947,96 @@ Output: ONLY raw Terraform HCL code (no prose, no markdown, no code fences). If
     except Exception as e:
         return f"# Error generating Terraform: {str(e)}"
 
+def generate_terraform_hcl_batch(items: List[Tuple[str, List[str], Dict[str, str], List[str]]]) -> Dict[str, str]:
+    """
+    Generate HCL for several resources in ONE Groq call.
+    items: (resource_name, docs_chunks, provided_values, required_fields) tuples.
+    Returns a dict: resource_name -> cleaned HCL (or MISSING_REQUIRED:<field>).
+    Resources missing from the LLM answer are generated concurrently, one call each.
+    """
+    if not items:
+        return {}
+    # Share the context budget between resources so the prompt stays bounded
+    per_item_chars = max(MAX_CONTEXT_CHARS // len(items), 1000)
+    payload = {
+        "resources": [
+            {
+                "name": name,
+                "values": values,
+                "required": required,
+                "docs": build_context(chunks, "\n\n---\n\n")[:per_item_chars],
+            }
+            for name, chunks, values, required in items
+        ]
+    }
+    prompt = f"""
+You are an expert Terraform generator for the CloudStack provider (cloudstack/cloudstack).
+For EACH entry in "resources" below, produce valid Terraform HCL for a single resource of that type,
+using only the user values given for required fields. If a required field is missing for an entry,
+its value must be exactly 'MISSING_REQUIRED:<field>'.
+Return ONLY one JSON object mapping each resource name to its raw HCL string (no markdown, no code fences).
+
+{json.dumps(payload, indent=2)}
+"""
+    result = safe_groq_json(prompt, default=None, retries=1)
+
+    generated: Dict[str, str] = {}
+    if isinstance(result, dict):
+        for name, _, _, _ in items:
+            hcl = result.get(name)
+            if isinstance(hcl, str) and hcl.strip():
+                generated[name] = clean_terraform_output(hcl.strip())
+
+    missing = [item for item in items if item[0] not in generated]
+    if missing:
+        async def fallback():
+            loop = asyncio.get_running_loop()
+            return await asyncio.gather(*(
+                loop.run_in_executor(None, functools.partial(generate_terraform_hcl, *item, stream=False))
+                for item in missing
+            ))
+        for item, hcl in zip(missing, asyncio.run(fallback())):
+            generated[item[0]] = hcl
+
+    return {name: generated[name] for name, _, _, _ in items}
+
 def clean_terraform_output(raw_output: str) -> str:
     """
     Remove markdown formatting and other unwanted content from LLM output.
     Returns clean HCL code.
     """
     # Remove markdown code fences
-    cleaned = re.sub(r'```(?:hcl|terraform)?\s*\n?', '', raw_output)
-    cleaned = re.sub(r'```\s*$', '', cleaned)
+    cleaned = _MARKDOWN_FENCE_OPEN.sub('', raw_output)
+    cleaned = _MARKDOWN_FENCE_CLOSE.sub('', cleaned)
+
+    # Fast path: one well-formed top-level resource block, unless the LLM
+    # signalled MISSING_REQUIRED before it
+    block = _RESOURCE_BLOCK.search(cleaned)
+    missing = _MISSING_RE.search(cleaned)
+    if missing and (block is None or missing.start() < block.start()):
+        return missing.group(0).strip()
+    if block:
+        text = block.group(0)
+        if text.count('{') == text.count('}'):
+            return text.strip()
     
     # Remove any leading/trailing markdown or prose
     lines = cleaned.split('\n')
     hcl_lines = []
     inside_resource = False
+    depth = 0  # brace depth of the resource block being collected
     
     for line in lines:
         # Start collecting when we see a resource block
-        if line.strip().startswith('resource '):
+        if not inside_resource and line.strip().startswith('resource '):
             inside_resource = True
             hcl_lines.append(line)
+            depth = line.count('{') - line.count('}')
         elif inside_resource:
             hcl_lines.append(line)
+            depth += line.count('{') - line.count('}')
             # Stop if we hit a closing brace at root level
-            if line.strip() == '}' and not any(c in ''.join(hcl_lines[:-1]) for c in ['{', '}']):
+            if depth <= 0 and line.strip() == '}':
                 break
         # Handle MISSING_REQUIRED case
         elif line.strip().startswith('MISSING_REQUIRED:'):
@@ -749,8 +1055,8 @@ def clean_terraform_output(raw_output: str) -> str:
     if not result or 'resource' not in result:
         # If we still don't have good content, return the original but cleaned
         fallback = raw_output
-        fallback = re.sub(r'```(?:hcl|terraform)?\s*\n?', '', fallback)
-        fallback = re.sub(r'```\s*', '', fallback)
+        fallback = _MARKDOWN_FENCE_OPEN.sub('', fallback)
+        fallback = _MARKDOWN_FENCE_ANY.sub('', fallback)
         return fallback.strip()
     
     return result
@@ -759,7 +1065,7 @@ def clean_terraform_output(raw_output: str) -> str:
 # ---------------------------
 def save_generated(resource_name: str, provided_values: Dict[str,str], terraform_code: str) -> Path:
     safe_name = provided_values.get("name") or provided_values.get("display_name") or "resource"
-    safe_name = re.sub(r"[^a-zA-Z0-9_\-]+", "_", safe_name)[:64]
+    safe_name = _UNSAFE_NAME_RE.sub("_", safe_name)[:64]
     fname = OUTPUT_DIR / f"terraform_{resource_name}_{safe_name}.tf"
     with open(fname, "w", encoding="utf-8") as f:
         f.write(terraform_code)
@@ -768,7 +1074,119 @@ def save_generated(resource_name: str, provided_values: Dict[str,str], terraform
 # ---------------------------
 # Main flow
 # ---------------------------
-def main():
+def _drain_stdin() -> None:
+    """Discard keys typed ahead so a prompt only sees the answer typed after it appears."""
+    if not sys.stdin.isatty():
+        return  # piped/scripted input: every line is intentional
+    try:
+        if os.name == "nt":
+            import msvcrt
+            while msvcrt.kbhit():
+                msvcrt.getwch()
+        else:
+            import termios
+            termios.tcflush(sys.stdin.fileno(), termios.TCIFLUSH)
+    except Exception:
+        pass
+
+STDOUT_CHUNK = 65536
+
+def encode_for_stdout(text: str) -> bytes:
+    """Encode once for repeated display (same codec the text layer would use)."""
+    return text.encode(getattr(sys.stdout, "encoding", None) or "utf-8", errors="replace")
+
+def write_chunked(data, n: int = STDOUT_CHUNK) -> None:
+    """
+    Write large text in ~64 KB pieces, flushing each so the terminal can render as it goes.
+    Pre-encoded bytes (encode_for_stdout) go straight to the binary buffer.
+    """
+    out = sys.stdout
+    if isinstance(data, bytes):
+        if hasattr(out, "buffer"):
+            out.flush()  # keep ordering with text already written
+            out = out.buffer
+        else:
+            data = data.decode(getattr(out, "encoding", None) or "utf-8", errors="replace")
+    for i in range(0, len(data), n):
+        out.write(data[i:i + n])
+        out.flush()
+
+def prompt_choice(msg: str) -> str:
+    _drain_stdin()
+    return input(msg).strip().lower()
+
+_NEXT_STEPS = (
+    "\n===== NEXT STEPS =====\n"
+    "1. Review the configuration file\n"
+    "2. cd to the directory containing the .tf file\n"
+    "3. Run: terraform init\n"
+    "4. Run: terraform plan\n"
+    "5. Run: terraform apply (if plan looks good)\n"
+)
+_NEXT_STEPS_WARN = _NEXT_STEPS + "\n⚠️  Fix validation issues before running terraform apply\n"
+
+# Choices offered when validation fails; each returns True to go on and save
+def _abort_invalid(hcl_bytes: bytes) -> bool:
+    print("Aborting. Please fix the issues and try again.")
+    return False
+
+def _view_then_confirm(hcl_bytes: bytes) -> bool:
+    print("\n===== GENERATED TERRAFORM (WITH ISSUES) =====")
+    write_chunked(hcl_bytes)
+    print("=" * 50)
+    if prompt_choice("\nSave this code anyway? [y/N]: ") != 'y':
+        print("Aborting.")
+        return False
+    return True
+
+def _save_anyway(hcl_bytes: bytes) -> bool:
+    return True
+
+_INVALID_ACTIONS = {'a': _abort_invalid, 'v': _view_then_confirm, 's': _save_anyway}
+
+@functools.lru_cache(maxsize=1)
+def _validation():
+    # Imported on first use: runs with TERRAFORM_VALIDATION=false never load hcl2
+    import terraform_validation
+    return terraform_validation
+
+_SAVE_EXECUTOR = ThreadPoolExecutor(max_workers=1)  # file writes overlap terminal output
+LAST_VALID_PATH = OUTPUT_DIR / ".last_valid"  # digest of the last HCL that passed validation
+# The provider docs carry no "Sensitive" markers, so secrets are recognised by name
+# (password, api_key, secret_key, ipsec_psk, ...). False positives are only asked again.
+_SECRET_FIELD_RE = re.compile(
+    r"pass(?:word|phrase)|secret|token|credential|private|psk|(?:^|_)key(?:_|$)", re.IGNORECASE
+)
+
+def _is_secret_field(field: str) -> bool:
+    return bool(_SECRET_FIELD_RE.search(field))
+
+def _cacheable_values(values: Dict[str, str]) -> Dict[str, Optional[str]]:
+    """Field values safe to keep on disk: secret fields are kept by name only (value None)."""
+    return {f: None if _is_secret_field(f) else v for f, v in values.items()}
+
+def _validation_digest(hcl_content: str, required_fields: List[str]) -> str:
+    raw = hcl_content + "\0" + "\0".join(required_fields)
+    return hashlib.blake2b(raw.encode("utf-8")).hexdigest()
+
+def _read_last_valid_digest() -> Optional[str]:
+    try:
+        return LAST_VALID_PATH.read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+
+def _write_last_valid_digest(digest: str) -> None:
+    try:
+        LAST_VALID_PATH.write_text(digest, encoding="utf-8")
+    except OSError:
+        pass  # only an optimisation for the next run
+
+def main(print_hcl: bool = False):
+    """print_hcl: echo the generated HCL even when stdout is not a terminal (--print-hcl)."""
+    # Piped / CI runs get the .tf file; streaming and dumping the code there is just noise
+    interactive = sys.stdout.isatty()
+    if TERRAFORM_VALIDATION_ENABLED:
+        _validation()  # imported now so the hcl2 parser warm-up overlaps the prompts
     print("Milvus RAG Terraform Agent (Step 1: validation & suggestions)\n")
 
     user_q = input("What do you want to provision? ").strip()
@@ -788,25 +1206,47 @@ def main():
         return
 
     # Compose context for suggestions
-    docs_context = "\n\n".join(docs_chunks[:MAX_CONTEXT_CHUNKS])
+    docs_context = build_context(docs_chunks)
 
     print(f"Required fields: {required_fields}")
 
-    # Extract optional fields (robust)
-    optional_fields = extract_optional_fields_from_docs(docs_context, required_fields)
-    if optional_fields:
-        print(f"Detected optional fields: {optional_fields}")
-
-    # 1) Ask required fields (must fill & validate)
-    required_vals = prompt_for_fields(required_fields, docs_context, required=True)
-
-    # 2) Ask optional fields optionally
-    opt_vals = {}
-    if optional_fields:
-        if input("Do you want to fill optional fields? (y/N): ").strip().lower() == "y":
-            opt_vals = prompt_for_fields(optional_fields, docs_context, required=False)
-
-    combined = {**required_vals, **opt_vals}
+    # 0) Values entered for this resource on a recent run can be reused. Only offered
+    # on a terminal: piped answers belong to the prompts below. Secrets are never cached.
+    values_path = _cache_path("values", resource)
+    combined = None
+    previous = _disk_cache_load(values_path, ttl=VALUES_CACHE_TTL) if sys.stdin.isatty() else None
+    if isinstance(previous, dict):
+        # Older cache files may still hold secret values: never show or reuse them
+        previous = _cacheable_values(previous)
+    if isinstance(previous, dict) and all(previous.get(f) or _is_secret_field(f) for f in required_fields):
+        known = {f: v for f, v in previous.items() if v is not None}
+        print(f"Values from your last run: {json.dumps(known)}")
+        if input("Reuse them? (y/N): ").strip().lower() == "y":
+            # Secret fields are asked again on every run
+            secret_required = [f for f in required_fields if _is_secret_field(f)]
+            secret_optional = [f for f, v in previous.items() if v is None and f not in required_fields]
+            combined = {
+                **known,
+                **prompt_for_fields(secret_required, docs_context, required=True),
+                **prompt_for_fields(secret_optional, docs_context, required=False),
+            }
+
+    if combined is None:
+        # Extract optional fields (robust) while the required-field suggestions are fetched
+        optional_fields, required_details = asyncio.run(_prefetch_field_info(docs_context, required_fields))
+        if optional_fields:
+            print(f"Detected optional fields: {optional_fields}")
+
+        # 1) Ask required fields (must fill & validate)
+        required_vals = prompt_for_fields(required_fields, docs_context, required=True, details_map=required_details)
+
+        # 2) Ask optional fields optionally
+        opt_vals = {}
+        if optional_fields:
+            if input("Do you want to fill optional fields? (y/N): ").strip().lower() == "y":
+                opt_vals = prompt_for_fields(optional_fields, docs_context, required=False)
+
+        combined = {**required_vals, **opt_vals}
     # final check that all required provided
     missing = [f for f in required_fields if not combined.get(f)]
     if missing:
@@ -814,82 +1254,85 @@ def main():
         print("Aborting to let you re-run and fill them.")
         return
 
-    # Generate HCL
-    hcl = generate_terraform_hcl(resource, docs_chunks, combined, required_fields)
+    # Generate HCL (streamed to the terminal as it is produced)
+    print("\n⏳ Generating Terraform...\n")
+    hcl = generate_terraform_hcl(resource, docs_chunks, combined, required_fields, stream=interactive)
 
     # If LLM signaled MISSING_REQUIRED, stop and show
     if isinstance(hcl, str) and hcl.strip().startswith("MISSING_REQUIRED:"):
         print("\nLLM reports missing required field:", hcl.strip())
         print("Please re-run and provide the missing value(s).")
         return
-# Add this code right after: hcl = generate_terraform_hcl(...)
-# and before: path = save_generated(...)
 
-    # Check for LLM error signal
-    if isinstance(hcl, str) and hcl.strip().startswith("MISSING_REQUIRED:"):
-        print("\nLLM reports missing required field:", hcl.strip())
-        print("Please re-run and provide the missing value(s).")
-        return
+    # Encoded once: shown either in the 'v' branch or in the final report.
+    # A streamed run has already put the code on the terminal: no second dump.
+    hcl_bytes = encode_for_stdout(hcl + "\n")
+    hcl_shown = interactive
 
     # NEW: Terraform Validation
     if TERRAFORM_VALIDATION_ENABLED:
-        print("\n🔍 Validating generated Terraform configuration...")
-        validation_results = comprehensive_terraform_validation(hcl, required_fields)
-        print_validation_results(validation_results)
+        # Same HCL as the last run that passed: nothing to re-check
+        validation_digest = _validation_digest(hcl, required_fields)
+        if validation_digest == _read_last_valid_digest():
+            print("\n✅ Unchanged since the last successful validation - skipping checks.")
+            validation_results = {'overall_valid': True, 'cached': True}
+        else:
+            print("\n🔍 Validating generated Terraform configuration...")
+            tv = _validation()
+            validation_results = tv.cached_terraform_validation(hcl, required_fields)
+            tv.print_validation_results(validation_results)
         
-        # Handle validation failures
-        if not validation_results['overall_valid']:
-            print("\n❌ Validation failed. What would you like to do?")
-            print("1. Save anyway (s)")
-            print("2. Abort and fix manually (a)")
-            print("3. Show the code and decide (v)")
-            
-            choice = input("Choose [s/a/v]: ").strip().lower()
+            # Handle validation failures
+            if not validation_results['overall_valid']:
+                print("\n❌ Validation failed. What would you like to do?")
+                print("1. Save anyway (s)")
+                print("2. Abort and fix manually (a)")
+                print("3. Show the code and decide (v)")
             
-            if choice == 'a':
-                print("Aborting. Please fix the issues and try again.")
-                return
-            elif choice == 'v':
-                print("\n===== GENERATED TERRAFORM (WITH ISSUES) =====")
-                print(hcl)
-                print("=" * 50)
-                
-                save_choice = input("\nSave this code anyway? [y/N]: ").strip().lower()
-                if save_choice != 'y':
-                    print("Aborting.")
+                choice = prompt_choice("Choose [s/a/v]: ")
+                # Anything but a/v saves, as 's' does
+                if not _INVALID_ACTIONS.get(choice, _save_anyway)(hcl_bytes):
                     return
-            # If choice == 's' or user chose to save after viewing, continue
-        else:
-            print("✅ All validations passed!")
+                hcl_shown = hcl_shown or choice == 'v'
+            else:
+                print("✅ All validations passed!")
+                # A pass without the terraform CLI is not final: check again once it is installed
+                if tv.check_terraform_installed():
+                    _write_last_valid_digest(validation_digest)
     
-    # Continue with saving (your existing code)
-    path = save_generated(resource, combined, hcl)
+    # Computed once for the report below
+    validated = TERRAFORM_VALIDATION_ENABLED and validation_results['overall_valid']
+    has_warnings = TERRAFORM_VALIDATION_ENABLED and not validated
+
+    _disk_cache_store(values_path, _cacheable_values(combined), ttl=VALUES_CACHE_TTL)
+
+    # Save in the background while the generated code is echoed to the terminal
+    save_future = _SAVE_EXECUTOR.submit(save_generated, resource, combined, hcl)
+
+    # Final report: built up front instead of ~15 prints; the HCL reuses its encoded bytes
+    if not hcl_shown and (interactive or print_hcl):
+        write_chunked("\n===== GENERATED TERRAFORM =====\n")
+        write_chunked(hcl_bytes)
     
+    # Add helpful next steps
+    write_chunked(_NEXT_STEPS_WARN if has_warnings else _NEXT_STEPS)
+
+    # Resolved once; a failing save or resolve ends the run before the status lines
+    try:
+        resolved = save_future.result().resolve()
+    except OSError as e:
+        print(f"\n❌ Could not save Terraform configuration: {e}")
+        return
+
     # Update the final output message
-    if TERRAFORM_VALIDATION_ENABLED and validation_results.get('overall_valid'):
-        print(f"\n✅ Validated Terraform configuration saved to: {path.resolve()}")
+    if validated:
+        print(f"\n✅ Validated Terraform configuration saved to: {resolved}")
     else:
-        print(f"\n💾 Terraform configuration saved to: {path.resolve()}")
-        if TERRAFORM_VALIDATION_ENABLED and not validation_results.get('overall_valid'):
+        print(f"\n💾 Terraform configuration saved to: {resolved}")
+        if has_warnings:
             print("⚠️  Note: Contains validation warnings - review before applying")
-    
-    print("\n===== GENERATED TERRAFORM =====")
-    print(hcl)
-    
-    # Add helpful next steps
-    print("\n===== NEXT STEPS =====")
-    print("1. Review the configuration file")
-    print("2. cd to the directory containing the .tf file")
-    print("3. Run: terraform init")
-    print("4. Run: terraform plan")
-    print("5. Run: terraform apply (if plan looks good)")
-    
-    if TERRAFORM_VALIDATION_ENABLED and not validation_results.get('overall_valid'):
-        print("\n⚠️  Fix validation issues before running terraform apply")
-    path = save_generated(resource, combined, hcl)
-    print(f"\n✅ Terraform saved to: {path.resolve()}\n")
-    print("===== GENERATED TERRAFORM =====\n")
-    print(hcl)
 
 if __name__ == "__main__":
-    main()
+    if "--clear-cache" in sys.argv[1:]:
+        clear_milvus_caches()  # e.g. after re-running milvus_ingest.py
+    main(print_hcl="--print-hcl" in sys.argv[1:])
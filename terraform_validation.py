@@ -0,0 +1,440 @@
+"""Terraform validation for generated HCL (syntax, required fields, `terraform validate`).
+
+Imported by milvus_rag_groq.main() at start-up, and only when TERRAFORM_VALIDATION is
+enabled: the parser warm-up thread runs while the user answers the prompts, and runs
+with validation off never load hcl2.
+"""
+import copy
+import functools
+import hashlib
+import io
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Tuple, Optional
+
+# HCL parsing for validation
+try:
+    import hcl2
+    HCL2_AVAILABLE = True
+    print("✅ HCL2 parser loaded successfully")
+except ImportError:
+    HCL2_AVAILABLE = False
+    print("⚠️ HCL2 parser not available")
+
+# ---------------------------
+# Configuration (env-friendly, same variables as milvus_rag_groq)
+# ---------------------------
+OUTPUT_DIR = Path(os.getenv("OUTPUT_DIR", "generated"))
+TERRAFORM_VALIDATION_ENABLED = os.getenv("TERRAFORM_VALIDATION", "true").lower() == "true"
+VALIDATION_TIMEOUT = int(os.getenv("VALIDATION_TIMEOUT", "60"))  # seconds
+TERRAFORM_BIN = os.getenv("TERRAFORM_BIN") or shutil.which("terraform")  # resolved once, no probe subprocess
+TF_WORKSPACE = OUTPUT_DIR / ".tf_workspace"  # initialized once, reused by every validation
+TF_PLUGIN_CACHE_DIR = Path(os.getenv("TF_PLUGIN_CACHE_DIR", str(OUTPUT_DIR / ".tf_plugin_cache")))
+
+# ---------------------------
+# Compiled patterns
+# ---------------------------
+# One-pass delimiter scan for the syntax pre-check. Comments are consumed whole;
+# a quote hands over to _HCL_STR_BODY so delimiters inside strings don't count.
+_HCL_SCAN = re.compile(
+    r"""
+      (?P<comment>\#[^\n]*|//[^\n]*|/\*.*?\*/)
+    | (?P<quote>")
+    | (?P<open>[{\[(])
+    | (?P<close>[}\])])
+    """,
+    re.DOTALL | re.VERBOSE,
+)
+# Literal part of a quoted string: stops at the closing quote or a ${...} / %{...}
+# template (whose expression may hold quotes of its own); $${ and %%{ are escapes.
+# Newlines are let through, as python-hcl2 does.
+_HCL_STR_BODY = re.compile(r'(?:\\.|\$\$\{|%%\{|[^"\\$%]|[$%](?!\{))*', re.DOTALL)
+_HCL_PAIRS = {"}": "{", "]": "[", ")": "("}
+
+@functools.lru_cache(maxsize=128)
+def _fields_assign_re(fields: Tuple[str, ...]) -> re.Pattern:
+    # Longest names first so a field never loses to one of its prefixes
+    alternation = "|".join(re.escape(f) for f in sorted(fields, key=len, reverse=True))
+    return re.compile(rf'\b({alternation})\s*=')
+
+# ---------------------------
+# Terraform Validation Functions
+# ---------------------------
+
+def check_terraform_installed() -> bool:
+    """Check if Terraform CLI is available."""
+    return TERRAFORM_BIN is not None
+
+def _warm_hcl2_parser():
+    # hcl2 builds its Lark parser on first use (~50 ms); do it while the user is typing
+    try:
+        hcl2.loads("")
+    except Exception:
+        pass
+
+if HCL2_AVAILABLE:
+    threading.Thread(target=_warm_hcl2_parser, daemon=True).start()
+
+def _hcl_delimiter_errors(hcl_content: str) -> List[str]:
+    """Cheap syntax check used without python-hcl2: unbalanced delimiters, unterminated strings."""
+    if "<<" in hcl_content:
+        return []  # heredocs may hold arbitrary text; leave them to the parser
+    errors = []
+    _scan_hcl_delimiters(hcl_content, 0, errors)
+    return errors
+
+def _scan_hcl_delimiters(text: str, pos: int, errors: List[str], in_template: bool = False) -> int:
+    """
+    Walk delimiters from pos. Inside a ${...} template, stops after the '}' closing it.
+    Returns the position reached, or -1 once an unterminated string/template ends the scan.
+    """
+    stack = []
+    while True:
+        m = _HCL_SCAN.search(text, pos)
+        if not m:
+            break
+        pos = m.end()
+        kind = m.lastgroup
+        if kind == "open":
+            stack.append(m.group(0))
+        elif kind == "close":
+            tok = m.group(0)
+            if not stack:
+                if in_template and tok == "}":
+                    return pos
+                errors.append(f"Unexpected '{tok}'")
+            elif stack.pop() != _HCL_PAIRS[tok]:
+                errors.append(f"Mismatched '{tok}'")
+        elif kind == "quote":
+            pos = _scan_hcl_string(text, pos, errors)
+            if pos < 0:
+                return -1
+    if in_template:
+        errors.append("Unterminated string")
+        return -1
+    if stack:
+        errors.append(f"Unclosed '{stack[-1]}'")
+    return pos
+
+def _scan_hcl_string(text: str, pos: int, errors: List[str]) -> int:
+    """Skip a quoted string whose opening quote ends at pos; -1 if it never closes."""
+    while True:
+        pos = _HCL_STR_BODY.match(text, pos).end()
+        if text.startswith('"', pos):
+            return pos + 1
+        if not text.startswith(("${", "%{"), pos):
+            errors.append("Unterminated string")  # end of input
+            return -1
+        pos = _scan_hcl_delimiters(text, pos + 2, errors, in_template=True)
+        if pos < 0:
+            return -1
+
+@functools.lru_cache(maxsize=256)
+def validate_hcl_syntax(hcl_content: str) -> Tuple[bool, str]:
+    """
+    Validate HCL syntax using python-hcl2.
+    Returns (is_valid, error_message)
+    Cached: re-validating the same text does not re-parse it.
+    Without python-hcl2, only the delimiter scan runs.
+    """
+    if not HCL2_AVAILABLE:
+        errors = _hcl_delimiter_errors(hcl_content)
+        if errors:
+            return False, f"Syntax error: {errors[0]}"
+        return True, "HCL2 parser not available - skipping syntax check"
+    
+    # The parser checks delimiters/strings itself: one tokenizing pass, no regex pre-scan
+    try:
+        # Parse the HCL content
+        parsed = hcl2.loads(hcl_content)
+        
+        # Basic structure validation
+        if not isinstance(parsed, dict):
+            return False, "Invalid HCL structure"
+            
+        # Check for required sections
+        has_content = any(key in parsed for key in ['resource', 'terraform', 'provider', 'data'])
+        if not has_content:
+            return False, "No valid Terraform blocks found"
+            
+        return True, "Syntax valid"
+        
+    except Exception as e:
+        error_msg = str(e)
+        # Lark errors carry the position of the offending token
+        line, column = getattr(e, "line", None), getattr(e, "column", None)
+        where = f" (line {line}, column {column})" if isinstance(line, int) and line > 0 else ""
+        if "unexpected token" in error_msg.lower():
+            return False, f"Syntax error: Check for missing quotes or brackets{where}"
+        elif "unterminated" in error_msg.lower():
+            return False, f"Syntax error: Missing closing quotes or brackets{where}"
+        else:
+            return False, f"Syntax error: {error_msg}"
+
+TF_PROVIDER_CONFIG = '''
+terraform {
+  required_providers {
+    cloudstack = {
+      source = "cloudstack/cloudstack"
+      version = "~> 0.5"
+    }
+  }
+}
+
+provider "cloudstack" {
+  api_url    = "http://localhost:8080/client/api"
+  api_key    = "dummy"
+  secret_key = "dummy"
+}
+'''
+
+_tf_workspace_lock = threading.Lock()
+
+def _terraform_env() -> Dict[str, str]:
+    # Shared plugin cache: providers are downloaded once, not per workspace
+    TF_PLUGIN_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    env = dict(os.environ)
+    env.setdefault("TF_PLUGIN_CACHE_DIR", str(TF_PLUGIN_CACHE_DIR.resolve()))
+    env.setdefault("TF_IN_AUTOMATION", "1")
+    return env
+
+def _ensure_tf_workspace(env: Dict[str, str]) -> Optional[str]:
+    """
+    Run `terraform init` once for the persistent workspace.
+    Returns an error message only for parse errors (other init failures are retried next call).
+    """
+    sentinel = TF_WORKSPACE / ".initialized"
+    if sentinel.exists():
+        return None
+
+    init_result = subprocess.run(
+        [TERRAFORM_BIN, 'init', '-input=false', '-no-color'],
+        cwd=TF_WORKSPACE,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        timeout=VALIDATION_TIMEOUT,
+        env=env
+    )
+    if init_result.returncode == 0:
+        sentinel.touch()
+        return None
+    stderr = init_result.stderr.decode("utf-8", errors="replace")
+    if "Error parsing" in stderr:
+        return f"Parse error: {stderr}"
+    # Other init errors might be OK (network issues, etc.)
+    return None
+
+def validate_terraform_cli(hcl_content: str) -> Tuple[bool, str]:
+    """
+    Validate using terraform validate command.
+    Returns (is_valid, message)
+    """
+    if not check_terraform_installed():
+        return True, "Terraform CLI not available"
+
+    with _tf_workspace_lock:
+        TF_WORKSPACE.mkdir(parents=True, exist_ok=True)
+        provider_tf = TF_WORKSPACE / "provider.tf"
+        if not provider_tf.exists():
+            provider_tf.write_text(TF_PROVIDER_CONFIG, encoding='utf-8')
+
+        # Only main.tf changes between validations
+        (TF_WORKSPACE / "main.tf").write_text(hcl_content, encoding='utf-8')
+
+        try:
+            env = _terraform_env()
+            init_error = _ensure_tf_workspace(env)
+            if init_error:
+                return False, init_error
+
+            # Run terraform validate
+            # stdout is never used; stderr is only decoded when validation fails
+            validate_result = subprocess.run(
+                [TERRAFORM_BIN, 'validate', '-no-color'],
+                cwd=TF_WORKSPACE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                timeout=30,
+                env=env
+            )
+
+            if validate_result.returncode == 0:
+                return True, "Terraform validation passed"
+            else:
+                stderr = validate_result.stderr.decode("utf-8", errors="replace")
+                return False, f"Validation failed: {stderr}"
+
+        except subprocess.TimeoutExpired:
+            return False, "Validation timed out"
+        except Exception as e:
+            return False, f"Validation error: {str(e)}"
+
+def validate_required_fields(hcl_content: str, required_fields: List[str]) -> Tuple[bool, List[str]]:
+    """
+    Check if all required fields are present.
+    Returns (all_present, missing_fields)
+    """
+    if not required_fields:
+        return True, []
+
+    # One scan for every `field =` assignment instead of one scan per field
+    pattern = _fields_assign_re(tuple(required_fields))
+    found = {m.group(1) for m in pattern.finditer(hcl_content)}
+    missing = [f for f in required_fields if f not in found]
+    
+    return len(missing) == 0, missing
+
+def comprehensive_terraform_validation(hcl_content: str, required_fields: List[str]) -> Dict[str, any]:
+    """
+    Run all validation checks.
+    Returns comprehensive results dictionary.
+    """
+    if not TERRAFORM_VALIDATION_ENABLED:
+        return {'overall_valid': True, 'message': 'Validation disabled'}
+    
+    results = {
+        'overall_valid': True,
+        'syntax_check': {'valid': True, 'message': ''},
+        'terraform_cli': {'valid': True, 'message': ''},
+        'required_fields': {'valid': True, 'missing': []},
+        'suggestions': []
+    }
+    
+    # Initialize variables to avoid UnboundLocalError
+    syntax_valid = True
+    cli_valid = True
+    cli_msg = ""
+    
+    # 1. HCL Syntax Check (milliseconds): decides whether the CLI run starts at all
+    try:
+        syntax_valid, syntax_msg = validate_hcl_syntax(hcl_content)
+        results['syntax_check'] = {'valid': syntax_valid, 'message': syntax_msg}
+        if not syntax_valid:
+            results['overall_valid'] = False
+    except Exception as e:
+        syntax_valid = False
+        results['syntax_check'] = {'valid': False, 'message': f"Syntax validation error: {str(e)}"}
+        results['overall_valid'] = False
+
+    # The terraform subprocess overlaps the required-fields check below
+    ex = ThreadPoolExecutor(max_workers=1) if syntax_valid else None
+    try:
+        fc = ex.submit(validate_terraform_cli, hcl_content) if ex else None
+
+        # 2. Required Fields Check
+        try:
+            fields_valid, missing_fields = validate_required_fields(hcl_content, required_fields)
+            results['required_fields'] = {'valid': fields_valid, 'missing': missing_fields}
+            if not fields_valid:
+                results['overall_valid'] = False
+        except Exception as e:
+            results['required_fields'] = {'valid': False, 'missing': [f"Error checking fields: {str(e)}"]}
+            results['overall_valid'] = False
+
+        # 3. Terraform CLI Validation (only if syntax is OK)
+        if fc is not None:
+            try:
+                cli_valid, cli_msg = fc.result()
+                results['terraform_cli'] = {'valid': cli_valid, 'message': cli_msg}
+                if not cli_valid and "not available" not in cli_msg:
+                    results['overall_valid'] = False
+            except Exception as e:
+                cli_valid = False
+                cli_msg = f"CLI validation error: {str(e)}"
+                results['terraform_cli'] = {'valid': False, 'message': cli_msg}
+                results['overall_valid'] = False
+        else:
+            # Skip CLI validation if syntax is invalid
+            results['terraform_cli'] = {'valid': True, 'message': 'Skipped due to syntax errors'}
+    finally:
+        if ex is not None:
+            ex.shutdown()
+
+    # 4. Generate suggestions
+    suggestions = []
+    if not syntax_valid:
+        suggestions.append("Fix HCL syntax errors")
+    if results['required_fields'].get('missing'):
+        missing = results['required_fields']['missing']
+        suggestions.append(f"Add missing required fields: {', '.join(missing)}")
+    if not cli_valid and "not available" not in cli_msg:
+        suggestions.append("Review Terraform validation errors")
+    
+    results['suggestions'] = suggestions
+    
+    return results
+
+_VALIDATION_CACHE: Dict[Tuple[bytes, Tuple[str, ...], bool], Dict] = {}
+_VALIDATION_CACHE_MAX = 128
+
+def cached_terraform_validation(hcl_content: str, required_fields: List[str]) -> Dict[str, any]:
+    """comprehensive_terraform_validation, memoized on the HCL text + required fields."""
+    key = (
+        hashlib.blake2b(hcl_content.encode("utf-8"), digest_size=16).digest(),
+        tuple(required_fields),
+        TERRAFORM_VALIDATION_ENABLED,  # toggling the flag must not serve stale results
+    )
+    cached = _VALIDATION_CACHE.get(key)
+    if cached is None:
+        cached = comprehensive_terraform_validation(hcl_content, required_fields)
+        if len(_VALIDATION_CACHE) >= _VALIDATION_CACHE_MAX:
+            _VALIDATION_CACHE.pop(next(iter(_VALIDATION_CACHE)))  # oldest first
+        _VALIDATION_CACHE[key] = cached
+    return copy.deepcopy(cached)
+
+def format_validation_results(results: Dict[str, any]) -> str:
+    """Render validation results as one block of text (cached on results['_rendered'])."""
+    rendered = results.get('_rendered')
+    if rendered is not None:
+        return rendered
+
+    buf = io.StringIO()
+    buf.write("\n📋 Validation Results:\n")
+    buf.write("=" * 40 + "\n")
+    
+    # Overall status
+    if results['overall_valid']:
+        buf.write("✅ Overall Status: VALID\n")
+    else:
+        buf.write("❌ Overall Status: INVALID\n")
+    
+    # Syntax check
+    syntax = results.get('syntax_check', {})
+    status_icon = "✅" if syntax.get('valid') else "❌"
+    buf.write(f"{status_icon} HCL Syntax: {syntax.get('message', 'Unknown')}\n")
+    
+    # Required fields
+    fields = results.get('required_fields', {})
+    if fields.get('missing'):
+        buf.write(f"❌ Required Fields: Missing {fields['missing']}\n")
+    else:
+        buf.write("✅ Required Fields: All present\n")
+    
+    # Terraform CLI
+    cli = results.get('terraform_cli', {})
+    status_icon = "✅" if cli.get('valid') else "❌"
+    cli_msg = cli.get('message', 'Unknown')
+    buf.write(f"{status_icon} Terraform CLI: {cli_msg}\n")
+    
+    # Suggestions
+    if results.get('suggestions'):
+        buf.write("\n💡 Suggestions:\n")
+        for i, suggestion in enumerate(results['suggestions'], 1):
+            buf.write(f"   {i}. {suggestion}\n")
+    
+    buf.write("=" * 40 + "\n")
+    rendered = results['_rendered'] = buf.getvalue()
+    return rendered
+
+def print_validation_results(results: Dict[str, any]):
+    """Display validation results in a user-friendly format."""
+    if not TERRAFORM_VALIDATION_ENABLED:
+        return
+    sys.stdout.write(format_validation_results(results))
+    sys.stdout.flush()
@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+# milvus_rag_groq exits without a key and connects to Milvus lazily; neither is needed here
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+os.environ["OUTPUT_DIR"] = tempfile.mkdtemp(prefix="terraform_agent_test_")
+os.environ["RAG_CACHE_TTL"] = "0"
+os.environ["VALUES_CACHE_TTL"] = "0"
+sys.modules.setdefault("pymilvus", mock.MagicMock())
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
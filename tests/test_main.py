@@ -0,0 +1,56 @@
+import os
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import milvus_rag_groq as agent
+
+HCL = 'resource "cloudstack_instance" "web" {\n  name = "web"\n}'
+
+
+async def _no_optional_fields(docs_text, required_fields):
+    return [], {}
+
+
+class MainSavesOnceTest(unittest.TestCase):
+    def run_main(self, validation_results=None, answers=("instance",)):
+        save = mock.Mock(return_value=Path(os.environ["OUTPUT_DIR"]) / "out.tf")
+        validation = mock.Mock()
+        validation.cached_terraform_validation.return_value = validation_results
+        inputs = iter(answers)
+        with mock.patch.multiple(
+            agent,
+            save_generated=save,
+            normalize_resource_query=mock.Mock(return_value="cloudstack_instance"),
+            search_docs=mock.Mock(return_value=(["name - (Required)"], ["name"])),
+            _prefetch_field_info=_no_optional_fields,
+            prompt_for_fields=mock.Mock(return_value={"name": "web"}),
+            generate_terraform_hcl=mock.Mock(return_value=HCL),
+            _validation=mock.Mock(return_value=validation),
+            _read_last_valid_digest=mock.Mock(return_value=None),
+            _write_last_valid_digest=mock.Mock(),
+            TERRAFORM_VALIDATION_ENABLED=validation_results is not None,
+        ), mock.patch("builtins.input", lambda prompt="": next(inputs, "")), \
+                mock.patch.object(agent, "prompt_choice", lambda msg: next(inputs, "")):
+            agent.main()
+        return save
+
+    def test_saves_once_without_validation(self):
+        save = self.run_main()
+        self.assertEqual(save.call_count, 1)
+        save.assert_called_once_with("cloudstack_instance", {"name": "web"}, HCL)
+
+    def test_saves_once_after_passing_validation(self):
+        save = self.run_main({'overall_valid': True})
+        self.assertEqual(save.call_count, 1)
+
+    def test_saves_once_when_saving_despite_failed_validation(self):
+        failed = {
+            'overall_valid': False,
+            'syntax_check': {'valid': True, 'message': 'Syntax valid'},
+            'terraform_cli': {'valid': False, 'message': 'Validation failed: x'},
+            'required_fields': {'valid': True, 'missing': []},
+            'suggestions': ['Review Terraform validation errors'],
+        }
+        save = self.run_main(failed, answers=("instance", "s"))
+        self.assertEqual(save.call_count, 1)
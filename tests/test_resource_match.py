@@ -0,0 +1,37 @@
+import unittest
+
+import milvus_rag_groq as agent
+
+# Resource names of the ingested CloudStack provider docs
+KNOWN = (
+    "cloudstack_account", "cloudstack_affinity_group", "cloudstack_autoscale_vm_profile",
+    "cloudstack_disk", "cloudstack_disk_offering", "cloudstack_domain", "cloudstack_egress_firewall",
+    "cloudstack_firewall", "cloudstack_instance", "cloudstack_ipaddress", "cloudstack_kubernetes_cluster",
+    "cloudstack_kubernetes_version", "cloudstack_loadbalancer_rule", "cloudstack_network",
+    "cloudstack_network_acl", "cloudstack_network_acl_rule", "cloudstack_network_offering",
+    "cloudstack_nic", "cloudstack_port_forward", "cloudstack_private_gateway",
+    "cloudstack_secondary_ipaddress", "cloudstack_security_group", "cloudstack_security_group_rule",
+    "cloudstack_service_offering", "cloudstack_ssh_keypair", "cloudstack_static_nat",
+    "cloudstack_static_route", "cloudstack_template", "cloudstack_user", "cloudstack_volume",
+    "cloudstack_vpc", "cloudstack_vpn_connection", "cloudstack_vpn_customer_gateway",
+    "cloudstack_vpn_gateway", "cloudstack_zone",
+)
+
+
+class LocalResourceMatchTest(unittest.TestCase):
+    def test_exact_names(self):
+        self.assertEqual(agent.local_resource_match("instance", KNOWN), "cloudstack_instance")
+        self.assertEqual(agent.local_resource_match("Network ACL", KNOWN), "cloudstack_network_acl")
+        self.assertEqual(agent.local_resource_match("cloudstack_vpc", KNOWN), "cloudstack_vpc")
+
+    @unittest.skipUnless(agent.RAPIDFUZZ_AVAILABLE, "rapidfuzz not installed")
+    def test_ambiguous_words_are_left_to_the_llm(self):
+        for query in ("group", "gateway", "rule", "offering", "vpn", "service", "kubernetes", "nat"):
+            with self.subTest(query=query):
+                self.assertIsNone(agent.local_resource_match(query, KNOWN))
+
+    @unittest.skipUnless(agent.RAPIDFUZZ_AVAILABLE, "rapidfuzz not installed")
+    def test_close_typos_resolve_locally(self):
+        self.assertEqual(agent.local_resource_match("secuirty group", KNOWN), "cloudstack_security_group")
+        self.assertEqual(agent.local_resource_match("vpn gatway", KNOWN), "cloudstack_vpn_gateway")
+        self.assertEqual(agent.local_resource_match("cloudstack_port_forwarding", KNOWN), "cloudstack_port_forward")
@@ -0,0 +1,28 @@
+import unittest
+
+import milvus_rag_groq as agent
+
+# Field names from the Argument Reference sections of cleaned_docs/
+SECRET_FIELDS = ("api_key", "secret_key", "ipsec_psk", "password")
+PLAIN_FIELDS = (
+    "name", "zone", "template", "service_offering", "network_id", "ip_address", "keypair",
+    "display_name", "cidr", "gateway", "esp_policy", "ike_policy", "username", "email",
+    "first_name", "last_name", "account", "domain_id", "vpc_id", "user_data", "api_url",
+)
+
+
+class SecretFieldTest(unittest.TestCase):
+    def test_doc_secrets_are_detected(self):
+        for field in SECRET_FIELDS:
+            with self.subTest(field=field):
+                self.assertTrue(agent._is_secret_field(field))
+
+    def test_plain_fields_are_kept(self):
+        for field in PLAIN_FIELDS:
+            with self.subTest(field=field):
+                self.assertFalse(agent._is_secret_field(field))
+
+    def test_cached_values_hold_no_secrets(self):
+        values = {"name": "gw", "cidr_list": "10.0.0.0/24", "ipsec_psk": "s3cret", "password": "hunter2"}
+        cached = agent._cacheable_values(values)
+        self.assertEqual(cached, {"name": "gw", "cidr_list": "10.0.0.0/24", "ipsec_psk": None, "password": None})